@@ -9,7 +9,9 @@ import signal
 import subprocess
 import sys
 import time
-from datetime import datetime
+from collections import deque
+from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict
 
@@ -117,11 +119,9 @@ def _short_key() -> str:
     return "OPT-" + "".join(secrets.choice(alphabet) for _ in range(5))
 
 
-def _driver_from_payload(payload: Dict[str, Any]):
-    driver_type = payload.get("type") or payload.get("id") or payload.get("name")
-    if not driver_type:
-        raise ValueError("driver.type manquant dans le fichier JSON")
-
+@lru_cache(maxsize=None)
+def _driver_mapping() -> Dict[str, Any]:
+    """Identifiant (id/nom/DRIVER_TYPE_ID) -> classe driver, construit une seule fois."""
     mapping = {}
     for drv in ALL_DRIVERS:
         try:
@@ -132,8 +132,15 @@ def _driver_from_payload(payload: Dict[str, Any]):
         mapping[identifier] = drv
         if hasattr(drv, "DRIVER_TYPE_ID"):
             mapping[str(getattr(drv, "DRIVER_TYPE_ID"))] = drv
+    return mapping
+
+
+def _driver_from_payload(payload: Dict[str, Any]):
+    driver_type = payload.get("type") or payload.get("id") or payload.get("name")
+    if not driver_type:
+        raise ValueError("driver.type manquant dans le fichier JSON")
 
-    drv_cls = mapping.get(driver_type)
+    drv_cls = _driver_mapping().get(str(driver_type))
     if drv_cls is None:
         raise ValueError(f"Driver inconnu: {driver_type}")
 
@@ -229,17 +236,17 @@ def cmd_logs(args, config):
         with path.open() as f:
             f.seek(0, os.SEEK_END)
             while True:
-                line = f.readline()
-                if not line:
+                # On vide tout ce qui est disponible avant un unique flush
+                chunk = f.readlines()
+                if not chunk:
                     time.sleep(0.5)
                     continue
-                sys.stdout.write(line)
+                sys.stdout.writelines(chunk)
                 sys.stdout.flush()
     else:
         with path.open() as f:
-            lines = f.readlines()[-args.lines :]
-        for l in lines:
-            sys.stdout.write(l)
+            lines = deque(f, maxlen=args.lines if args.lines > 0 else None)
+        sys.stdout.writelines(lines)
 
 
 def cmd_update(args, config):
@@ -270,7 +277,7 @@ def cmd_web(args, config):
 def cmd_db_backup(args, config):
     ensure_runtime_dirs()
     path_db = _resolve_db_path(config)
-    ts = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    ts = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
     dest = BACKUPS_DIR / f"backup-{ts}.db"
     shutil.copy2(path_db, dest)
     logger.info("Backup DB créé: %s", dest)
@@ -317,8 +324,7 @@ def cmd_client_rm(args, config):
         cols = db.execute_query(f"PRAGMA table_info('{table}')")
         col_names = {c[1] for c in cols}
         if "client_id" in col_names:
-            db.execute_commit(f"DELETE FROM {table} WHERE client_id = ?", (cid,))
-            db.execute_commit(f"DELETE FROM {table} WHERE client_id = ?", (cid_str,))
+            db.execute_commit(f"DELETE FROM {table} WHERE client_id IN (?, ?)", (cid, cid_str))
 
     # 2) Tables that store client ID in an "id" column.
     id_tables = {
@@ -383,7 +389,7 @@ def cmd_key_gen(args, config):
     _ensure_activation_table(db)
     cid = int(args.client_id) if args.client_id is not None else None
     key = _short_key()
-    ts = datetime.utcnow().isoformat()
+    ts = datetime.now(timezone.utc).isoformat()
     db.execute_commit(
         "INSERT OR REPLACE INTO activation_keys (activation_key, client_id, status, created_at) VALUES (?, ?, 'issued', ?)",
         (key, cid, ts),
@@ -45,6 +45,29 @@ class AllClients:
         self.leaders = []
         self.weather_infos = None 
         logger.debug("AllClients object initialized successfully") 
+
+    @property
+    def list_of_clients(self):
+        """Get the list of all clients.
+
+        Returns:
+            list: All Client objects, in insertion order.
+
+        Note:
+            Reassigning the list rebuilds the ID index used by which_client_by_id.
+            Use add() and delete_client() rather than mutating the list in place.
+        """
+        return self._list_of_clients
+
+    @list_of_clients.setter
+    def list_of_clients(self, clients):
+        """Set the list of clients and rebuild the client ID index.
+
+        Args:
+            clients (list): Client objects to store.
+        """
+        self._list_of_clients = clients
+        self._by_id = {client.client_id: client for client in clients}
         
     @property 
     def weather_infos(self):
@@ -102,13 +125,13 @@ class AllClients:
         if not isinstance(client, Client):
             logger.error("Failed to add client: object must be of type Client, got %s", type(client).__name__)
             raise TypeError("L'objet à ajouter doit être de type Client")
-        for clt in self.list_of_clients:
-            if clt.client_id == client.client_id:
-                logger.error("Failed to add client: client ID %s already exists", client.client_id)
-                raise ClientAlreadyExists("Ce client existe déjà, essayez avec un autre ID")
+        if client.client_id in self._by_id:
+            logger.error("Failed to add client: client ID %s already exists", client.client_id)
+            raise ClientAlreadyExists("Ce client existe déjà, essayez avec un autre ID")
         
         closest_leader = self._closest_leader(client)
 
+        self._by_id[client.client_id] = client
         if closest_leader is None:
             self.list_of_clients.append(client)
             self.clients_with_leaders.append((client, client))
@@ -122,8 +145,7 @@ class AllClients:
     def which_client_by_id(self, ID: int):
         """Find and return a client by their ID.
         
-        Searches through the list of clients and returns the client matching
-        the provided ID.
+        Looks the client up in the ID index kept alongside list_of_clients.
         
         Args:
             ID (int): The unique identifier of the client to find.
@@ -131,12 +153,12 @@ class AllClients:
         Returns:
             Client or None: The Client object with matching ID, or None if not found.
         """
-        for client in self.list_of_clients:
-            if client.client_id == ID:
-                logger.debug("Client found with ID %s", ID)
-                return client
-        logger.debug("No client found with ID %s", ID)
-        return None  
+        client = self._by_id.get(ID)
+        if client is not None:
+            logger.debug("Client found with ID %s", ID)
+        else:
+            logger.debug("No client found with ID %s", ID)
+        return client
 
     def delete_client(self, client: Client):
         """Remove a client from the collection.
@@ -153,6 +175,8 @@ class AllClients:
         """
         if client in self.list_of_clients:
             self.list_of_clients.remove(client)
+            if self._by_id.get(client.client_id) is client:
+                del self._by_id[client.client_id]
             logger.info("Client %s removed from collection", client.client_id)
         else:
             logger.warning("Attempted to remove client %s that does not exist in collection", client.client_id)   
@@ -179,28 +203,23 @@ class AllClients:
             logger.debug("No leaders available for client %s", client.client_id)
             return None
 
-        lat1 = client.client_weather.position.latitude
-        lon1 = client.client_weather.position.longitude
+        # Les termes propres au client sont calculés une seule fois, hors de la boucle
+        phi1 = math.radians(client.client_weather.position.latitude)
+        lam1 = math.radians(client.client_weather.position.longitude)
+        cos_phi1 = math.cos(phi1)
 
         def dist_km(c):
             R = 6371
-            lat2 = c.client_weather.position.latitude
-            lon2 = c.client_weather.position.longitude
+            phi2 = math.radians(c.client_weather.position.latitude)
+            lam2 = math.radians(c.client_weather.position.longitude)
 
-            phi1, phi2 = map(math.radians, [lat1, lat2])
-            dphi = math.radians(lat2 - lat1)
-            dl = math.radians(lon2 - lon1)
-
-            a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dl/2)**2
+            a = math.sin((phi2 - phi1) / 2)**2 + cos_phi1*math.cos(phi2)*math.sin((lam2 - lam1) / 2)**2
             return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
-        candidates = [(dist_km(l), l) for l in self.leaders]
-        
-        if not candidates:
-            return None
-            
-        # On trouve le tuple avec la plus petite distance
-        min_dist, best_leader_obj = min(candidates, key=lambda x: x[0])
+        # On trouve le tuple avec la plus petite distance (sans liste intermédiaire)
+        min_dist, best_leader_obj = min(
+            ((dist_km(l), l) for l in self.leaders), key=lambda x: x[0]
+        )
 
         # On retourne l'OBJET, pas la distance
         if min_dist < AllClients.MINIMAL_DISTANCE:
@@ -283,30 +302,37 @@ class AllClients:
         # Normalise output for optimiser_engine: datetime index only (no mixed int/Timestamp index).
         if isinstance(productions, pd.DataFrame):
             if "Datetime" in productions.columns:
-                productions = productions.copy()
-                productions["Datetime"] = pd.to_datetime(
-                    productions["Datetime"], utc=True, errors="coerce"
+                # Le masque booléen crée déjà un nouveau DataFrame : pas besoin de copy().
+                idx = pd.DatetimeIndex(
+                    pd.to_datetime(productions["Datetime"], utc=True, errors="coerce"),
+                    name="Datetime",
                 )
-                productions = productions.dropna(subset=["Datetime"]).set_index("Datetime")
+                mask = idx.notna()
+                productions = productions.loc[mask, productions.columns != "Datetime"]
+                productions.index = idx[mask]
             elif not isinstance(productions.index, pd.DatetimeIndex):
                 idx = pd.to_datetime(productions.index, utc=True, errors="coerce")
                 if getattr(idx, "notna", None) is not None:
                     mask = idx.notna()
-                    productions = productions.loc[mask].copy()
+                    productions = productions.loc[mask]
                     idx = idx[mask]
                 productions.index = idx
 
             if isinstance(productions.index, pd.DatetimeIndex):
-                if productions.index.tz is None:
+                # Skip the tz/sort passes when the index is already aligned (common case).
+                tz = productions.index.tz
+                if tz is None:
                     productions.index = productions.index.tz_localize("UTC")
-                else:
+                elif str(tz) != "UTC":
                     productions.index = productions.index.tz_convert("UTC")
-                productions = productions.sort_index()
+                if not productions.index.is_monotonic_increasing:
+                    productions = productions.sort_index()
 
             if "production" in productions.columns:
-                productions["production"] = pd.to_numeric(
-                    productions["production"], errors="coerce"
-                )
+                if not pd.api.types.is_numeric_dtype(productions["production"]):
+                    productions = productions.assign(
+                        production=pd.to_numeric(productions["production"], errors="coerce")
+                    )
                 productions = productions.dropna(subset=["production"])
 
         client.production_forecast = productions
@@ -5,6 +5,23 @@ from ..core.client_model import Client
 from optimiser_engine import Client as EngineClient
 from weather_manager import Client as WeatherClient
 
+_INSERT_DRIVER_SQL = "INSERT OR IGNORE INTO Drivers (driver_id, nom_driver) VALUES (?, ?)"
+_UPSERT_CLIENT_SQL = """
+    INSERT INTO users_main (id, weather_ref, config_engine, config_weather, driver_id, config_driver)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        weather_ref = excluded.weather_ref,
+        config_engine = excluded.config_engine,
+        config_weather = excluded.config_weather,
+        driver_id = excluded.driver_id,
+        config_driver = excluded.config_driver
+"""
+
+_SELECT_CLIENTS_SQL = (
+    "SELECT id, weather_ref, config_engine, config_weather, driver_id, config_driver FROM users_main"
+)
+_SELECT_CLIENT_SQL = _SELECT_CLIENTS_SQL + " WHERE id = ?"
+
 class ClientManager:
     def __init__(self, db_manager):
         """
@@ -20,6 +37,100 @@ class ClientManager:
         """
         self.db_manager = db_manager
 
+    def _driver_lookup(self) -> tuple:
+        """
+        BUT :
+        Préparer les correspondances nécessaires pour retrouver la classe driver d'un client.
+
+        RETOUR :
+        - (driver_names, driver_by_id, driver_by_name) : driver_id -> nom (table Drivers),
+          DRIVER_TYPE_ID -> classe, nom -> classe.
+        """
+        try:
+            from ..drivers import ALL_DRIVERS
+        except ImportError as exc:
+            raise ImportError("Impossible de charger les drivers (fichier de configuration manquant ?)") from exc
+
+        # On récupère le mapping driver_id -> nom_driver depuis la table Drivers
+        driver_rows = self.db_manager.execute_query("SELECT driver_id, nom_driver FROM Drivers")
+        driver_names = {rid: name for rid, name in driver_rows}
+
+        # Préparation des mappings pour retrouver la classe driver à partir de l'ID ou du nom
+        driver_by_id = {drv.DRIVER_TYPE_ID: drv for drv in ALL_DRIVERS if hasattr(drv, "DRIVER_TYPE_ID")}
+        driver_by_name = {}
+        for drv in ALL_DRIVERS:
+            try:
+                defn = drv.get_driver_def()
+                drv_name = defn.get("id") or defn.get("name") or drv.__name__
+            except Exception:
+                drv_name = drv.__name__
+            driver_by_name[drv_name] = drv
+        return driver_names, driver_by_id, driver_by_name
+
+    @staticmethod
+    def _build_client(row: tuple, drivers: tuple, start_driver: bool) -> Client:
+        """
+        BUT :
+        Instancier un objet Client à partir d'une ligne de users_main (voir _SELECT_CLIENTS_SQL).
+
+        ARGUMENTS :
+        - row : (id, weather_ref, config_engine, config_weather, driver_id, config_driver).
+        - drivers : Correspondances renvoyées par _driver_lookup().
+        - start_driver : Démarrer ou non le driver du client.
+        """
+        client_id, _weather_ref, cfg_engine, cfg_weather, driver_id, cfg_driver = row
+        driver_names, driver_by_id, driver_by_name = drivers
+
+        # Engine
+        engine_payload = json.loads(cfg_engine) if cfg_engine else {}
+        client_engine = EngineClient.from_dict(engine_payload)
+        client_engine.client_id = client_id
+
+        # Weather
+        weather_data = json.loads(cfg_weather) if cfg_weather else {}
+        client_weather = WeatherClient.from_dict(weather_data)
+        client_weather.client_id = client_id
+
+        # Driver
+        if driver_id is None:
+            raise ValueError(f"Driver manquant pour le client {client_id}")
+
+        driver_name = driver_names.get(driver_id)
+        driver_cls = driver_by_id.get(driver_id)
+        if driver_cls is None and driver_name is not None:
+            driver_cls = driver_by_name.get(driver_name)
+        if driver_cls is None:
+            raise ValueError(f"Driver inconnu pour l'ID {driver_id} (nom='{driver_name}')")
+
+        driver_conf = json.loads(cfg_driver) if cfg_driver else {}
+        driver_obj = driver_cls.dict_to_device(driver_conf)
+
+        return Client(
+            client_id=client_id,
+            client_engine=client_engine,
+            client_weather=client_weather,
+            driver=driver_obj,
+            start_driver=start_driver,
+        )
+
+    def get_client(self, client_id: int, start_driver: bool = True):
+        """
+        BUT :
+        Reconstruire un seul client à partir de sa ligne users_main, sans désérialiser
+        toute la flotte (lecture de configuration par l'interface web).
+
+        ARGUMENTS :
+        - client_id : Identifiant du client.
+        - start_driver : Démarrer ou non le driver du client.
+
+        RETOUR :
+        - Client, ou None si l'identifiant est introuvable.
+        """
+        rows = self.db_manager.execute_query(_SELECT_CLIENT_SQL, (client_id,))
+        if not rows:
+            return None
+        return self._build_client(rows[0], self._driver_lookup(), start_driver)
+
     def get_all_clients(self, start_driver: bool = True) -> AllClients:
         """
         BUT : 
@@ -41,74 +152,21 @@ class ClientManager:
         4. Assembler le tout dans un objet AllClients.
         5. Retourner cet objet.
         """
-        rows = self.db_manager.execute_query(
-            "SELECT id, weather_ref, config_engine, config_weather, driver_id, config_driver FROM users_main"
-        )
+        rows = self.db_manager.execute_query(_SELECT_CLIENTS_SQL)
 
         # Aucun client enregistré
         if not rows:
             return AllClients()
 
-        try:
-            from ..drivers import ALL_DRIVERS
-        except ImportError as exc:
-            raise ImportError("Impossible de charger les drivers (fichier de configuration manquant ?)") from exc
-
-        # On récupère le mapping driver_id -> nom_driver depuis la table Drivers
-        driver_rows = self.db_manager.execute_query("SELECT driver_id, nom_driver FROM Drivers")
-        driver_names = {rid: name for rid, name in driver_rows}
-
-        # Préparation des mappings pour retrouver la classe driver à partir de l'ID ou du nom
-        driver_by_id = {drv.DRIVER_TYPE_ID: drv for drv in ALL_DRIVERS if hasattr(drv, "DRIVER_TYPE_ID")}
-        driver_by_name = {}
-        for drv in ALL_DRIVERS:
-            try:
-                defn = drv.get_driver_def()
-                drv_name = defn.get("id") or defn.get("name") or drv.__name__
-            except Exception:
-                drv_name = drv.__name__
-            driver_by_name[drv_name] = drv
+        drivers = self._driver_lookup()
 
         clients = {}
         weather_refs = {}
 
         for row in rows:
-            client_id, weather_ref, cfg_engine, cfg_weather, driver_id, cfg_driver = row
-
-            # Engine
-            engine_payload = json.loads(cfg_engine) if cfg_engine else {}
-            client_engine = EngineClient.from_dict(engine_payload)
-            client_engine.client_id = client_id
-
-            # Weather
-            weather_data = json.loads(cfg_weather) if cfg_weather else {}
-            client_weather = WeatherClient.from_dict(weather_data)
-            client_weather.client_id = client_id
-
-            # Driver
-            if driver_id is None:
-                raise ValueError(f"Driver manquant pour le client {client_id}")
-
-            driver_name = driver_names.get(driver_id)
-            driver_cls = driver_by_id.get(driver_id)
-            if driver_cls is None and driver_name is not None:
-                driver_cls = driver_by_name.get(driver_name)
-            if driver_cls is None:
-                raise ValueError(f"Driver inconnu pour l'ID {driver_id} (nom='{driver_name}')")
-
-            driver_conf = json.loads(cfg_driver) if cfg_driver else {}
-            driver_obj = driver_cls.dict_to_device(driver_conf)
-
-            client_obj = Client(
-                client_id=client_id,
-                client_engine=client_engine,
-                client_weather=client_weather,
-                driver=driver_obj,
-                start_driver=start_driver,
-            )
-
-            clients[client_id] = client_obj
-            weather_refs[client_id] = weather_ref
+            client_obj = self._build_client(row, drivers, start_driver)
+            clients[client_obj.client_id] = client_obj
+            weather_refs[client_obj.client_id] = row[1]
 
         # Reconstruction de AllClients sans recalculer les leaders par distance
         all_clients = AllClients()
@@ -192,9 +250,12 @@ class ClientManager:
              a. Sérialiser les configurations (Engine, Weather, Driver) en format JSON string.
              b. Vérifier si le Driver existe dans la table 'Drivers', sinon l'insérer (INSERT OR IGNORE).
              c. Préparer la requête INSERT OR REPLACE INTO users_main.
-             d. Exécuter la requête via self.db_manager.execute_commit() avec les paramètres 
-                (id, weather_ref, config_engine_yaml, config_weather_yaml, driver_id, ...).
+             d. Accumuler les paramètres (id, weather_ref, config_engine_yaml, config_weather_yaml, driver_id, ...).
+        2. Exécuter les deux requêtes en lot via self.db_manager.execute_many() (un commit par requête
+           au lieu de deux par client).
         """
+        driver_rows = []
+        client_rows = []
         for client in all_clients.list_of_clients:
             client_id = client.client_id
 
@@ -213,29 +274,23 @@ class ClientManager:
                 raise ValueError(f"Le driver du client {client_id} n'a pas de DRIVER_TYPE_ID défini.")
 
             try:
-                driver_name = driver.get_driver_def().get("id") or driver.get_driver_def().get("name")
+                driver_def = driver.get_driver_def()
+                driver_name = driver_def.get("id") or driver_def.get("name")
             except Exception:
                 driver_name = driver.__class__.__name__
 
             config_driver_yaml = json.dumps(driver.device_to_dict())
 
-            # 1) S'assurer que le driver est répertorié
-            self.db_manager.execute_commit(
-                "INSERT OR IGNORE INTO Drivers (driver_id, nom_driver) VALUES (?, ?)",
-                (driver_id, driver_name),
+            driver_rows.append((driver_id, driver_name))
+            client_rows.append(
+                (client_id, weather_ref, config_engine_yaml, config_weather_yaml, driver_id, config_driver_yaml)
             )
 
-            # 2) Insérer / Mettre à jour le client sans supprimer la ligne (évite de casser les FK)
-            self.db_manager.execute_commit(
-                """
-                INSERT INTO users_main (id, weather_ref, config_engine, config_weather, driver_id, config_driver)
-                VALUES (?, ?, ?, ?, ?, ?)
-                ON CONFLICT(id) DO UPDATE SET
-                    weather_ref = excluded.weather_ref,
-                    config_engine = excluded.config_engine,
-                    config_weather = excluded.config_weather,
-                    driver_id = excluded.driver_id,
-                    config_driver = excluded.config_driver
-                """,
-                (client_id, weather_ref, config_engine_yaml, config_weather_yaml, driver_id, config_driver_yaml),
-            )
+        if not client_rows:
+            return
+
+        # 1) S'assurer que les drivers sont répertoriés
+        self.db_manager.execute_many(_INSERT_DRIVER_SQL, driver_rows)
+
+        # 2) Insérer / Mettre à jour les clients sans supprimer les lignes (évite de casser les FK)
+        self.db_manager.execute_many(_UPSERT_CLIENT_SQL, client_rows)
@@ -1,9 +1,52 @@
 from pathlib import Path
 import sqlite3
+import threading
+import weakref
 from .client_manager import ClientManager
 from .getters import Getter
 from .reporters import Reporter
 
+# Délai (secondes) pendant lequel SQLite réessaie avant de lever "database is locked"
+BUSY_TIMEOUT_S = 5.0
+# Cache de pages par connexion (valeur négative = en Kio, ici ~20 Mo)
+CACHE_SIZE_KIB = 20000
+# Requêtes compilées gardées par connexion (les modules utilisent des textes SQL constants)
+STATEMENT_CACHE_SIZE = 256
+# Lectures via mmap (jusqu'à 256 Mo du fichier) plutôt que par appels read()
+MMAP_SIZE_BYTES = 256 * 1024 * 1024
+
+
+def _close_connections(opened: list, registry: set, lock) -> None:
+    # Appelée quand le thread propriétaire disparaît (ou à l'arrêt) : ne référence pas le
+    # _ThreadConnections lui-même, sinon il ne serait jamais collecté.
+    with lock:
+        for conn in opened:
+            registry.discard(conn)
+    for conn in opened:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    opened.clear()
+
+
+class _ThreadConnections:
+    """Connexions SQLite d'un thread (écriture et lecture), rangées dans son threading.local.
+
+    Les threads de l'interface web (anyio) s'arrêtent après quelques secondes d'inactivité :
+    leur threading.local est alors libéré, et le finaliseur ferme leurs connexions et les
+    retire du registre du DBManager.
+    """
+
+    __slots__ = ("conn", "ro_conn", "opened", "__weakref__")
+
+    def __init__(self, registry: set, lock) -> None:
+        self.conn = None
+        self.ro_conn = None
+        self.opened = []
+        weakref.finalize(self, _close_connections, self.opened, registry, lock)
+
+
 class DBManager:
     def __init__(self, path_db: Path):
         """
@@ -26,6 +69,16 @@ class DBManager:
         self.path_db = Path(path_db)
         self.path = self.path_db  # Alias pratique pour les appels externes éventuels
 
+        # Une connexion par thread, réutilisée d'un appel à l'autre (voir _get_connection).
+        # Chaque thread a une connexion de lecture et une d'écriture ; les écritures du
+        # processus passent une par une (self._write_lock) au lieu de se disputer le verrou SQLite.
+        # self._connections ne contient que les connexions des threads vivants (voir _ThreadConnections) :
+        # au plus deux par thread. Verrou réentrant : un finaliseur peut s'exécuter pendant qu'il est tenu.
+        self._local = threading.local()
+        self._connections = set()
+        self._connections_lock = threading.RLock()
+        self._write_lock = threading.Lock()
+
         # On s'assure que le dossier existe pour pouvoir créer le fichier SQLite
         self.path_db.parent.mkdir(parents=True, exist_ok=True)
 
@@ -54,7 +107,7 @@ class DBManager:
         self.get_decisions_taken = self.getter.get_decisions
         self.get_decisions = self.getter.get_decisions
 
-    def _get_connection(self) -> sqlite3.Connection:
+    def _connect(self, readonly: bool = False) -> sqlite3.Connection:
         """
         BUT : 
         Méthode utilitaire privée (interne). Crée et renvoie un objet connexion brut vers SQLite.
@@ -64,15 +117,87 @@ class DBManager:
         - conn (sqlite3.Connection) : L'objet de connexion ouvert.
 
         ÉTAPES :
-        1. Créer la connexion avec sqlite3.connect(self.path_db).
+        1. Créer la connexion avec sqlite3.connect(self.path_db), avec un busy timeout
+           (attente au lieu de "database is locked" quand un autre processus écrit) et des
+           transactions d'écriture ouvertes en BEGIN IMMEDIATE (verrou pris dès le début).
+           check_same_thread=False uniquement pour permettre close() depuis le thread d'arrêt :
+           chaque connexion reste utilisée par un seul thread. Le cache de statements est agrandi
+           pour que toutes les requêtes constantes de l'application y tiennent.
         2. Exécuter la commande SQL "PRAGMA foreign_keys = ON;" pour garantir l'intégrité des données
            (pour que les cascades ON DELETE fonctionnent).
-        3. Renvoyer l'objet conn.
+        3. Passer synchronous à NORMAL (suffisant et bien plus rapide en mode WAL).
+        4. Agrandir le cache de pages, activer la lecture par mmap et garder les tables temporaires
+           (tris, GROUP BY) en mémoire.
+        5. Si readonly, interdire toute écriture sur cette connexion (PRAGMA query_only) :
+           en WAL, elle lit sans jamais attendre l'écrivain.
+        6. Renvoyer l'objet conn.
         """
-        conn = sqlite3.connect(self.path_db)
+        conn = sqlite3.connect(
+            self.path_db,
+            timeout=BUSY_TIMEOUT_S,
+            isolation_level="IMMEDIATE",
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
         conn.execute("PRAGMA foreign_keys = ON;")
+        conn.execute("PRAGMA synchronous = NORMAL;")
+        conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB};")
+        conn.execute("PRAGMA temp_store = MEMORY;")
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE_BYTES};")
+        if readonly:
+            conn.execute("PRAGMA query_only = ON;")
         return conn
 
+    def _get_connection(self, readonly: bool = False) -> sqlite3.Connection:
+        """
+        BUT :
+        Renvoyer la connexion SQLite du thread courant, en la créant au premier appel.
+        Évite de rouvrir le fichier et de réappliquer les PRAGMA à chaque requête.
+
+        ARGUMENTS :
+        - readonly (bool) : True pour la connexion de lecture du thread, False pour celle d'écriture.
+
+        RETOUR :
+        - conn (sqlite3.Connection) : Connexion propre au thread appelant.
+
+        ÉTAPES :
+        1. Chercher les connexions du thread (_ThreadConnections) dans self._local, en les
+           créant au premier appel.
+        2. Si la connexion demandée est absente, l'ouvrir via self._connect() et l'enregistrer
+           dans self._connections (pour close()). Elle en est retirée et fermée quand le thread
+           se termine.
+        3. Renvoyer la connexion. Le "with conn" des appelants gère commit/rollback
+           sans la fermer.
+        """
+        holder = getattr(self._local, "connections", None)
+        if holder is None:
+            holder = _ThreadConnections(self._connections, self._connections_lock)
+            self._local.connections = holder
+        attr = "ro_conn" if readonly else "conn"
+        conn = getattr(holder, attr)
+        if conn is None:
+            conn = self._connect(readonly=readonly)
+            setattr(holder, attr, conn)
+            holder.opened.append(conn)
+            with self._connections_lock:
+                self._connections.add(conn)
+        return conn
+
+    def close(self) -> None:
+        """
+        BUT :
+        Fermer toutes les connexions ouvertes par les différents threads (arrêt du service).
+        """
+        with self._connections_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
     def _initialize_db(self) -> None:
         """
         BUT : 
@@ -82,17 +207,20 @@ class DBManager:
         ÉTAPES :
         1. Localiser le fichier 'schema.sql' (généralement dans le même dossier que ce script).
         2. Lire le contenu texte du fichier 'schema.sql'.
-        3. Ouvrir une connexion via self._get_connection().
-        4. Exécuter le script SQL complet (executescript) pour créer les tables (Drivers, users_main, etc.)
+        3. Ouvrir une connexion dédiée via self._connect().
+        4. Passer la base en journal WAL (persistant dans le fichier) : les lectures du service
+           et de l'interface web ne sont plus bloquées par les écritures.
+        5. Exécuter le script SQL complet (executescript) pour créer les tables (Drivers, users_main, etc.)
            si elles n'existent pas (IF NOT EXISTS).
-        5. Fermer la connexion.
+        6. Fermer la connexion.
         """
         schema_path = Path(__file__).resolve().parent / "schema.sql"
         with open(schema_path, "r", encoding="utf-8") as f:
             schema_sql = f.read()
 
-        conn = self._get_connection()
+        conn = self._connect()
         try:
+            conn.execute("PRAGMA journal_mode = WAL;")
             conn.executescript(schema_sql)
         finally:
             conn.close()
@@ -111,13 +239,13 @@ class DBManager:
         - results (list) : Une liste de tuples correspondant aux lignes trouvées.
 
         ÉTAPES :
-        1. Utiliser un Context Manager (with self._get_connection() as conn) pour gérer ouverture/fermeture.
+        1. Utiliser la connexion de lecture du thread (self._get_connection(readonly=True)).
         2. Créer un curseur.
         3. Exécuter cursor.execute(query, params).
         4. Récupérer tous les résultats avec cursor.fetchall().
         5. Retourner les résultats.
         """
-        with self._get_connection() as conn:
+        with self._get_connection(readonly=True) as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
             results = cursor.fetchall()
@@ -135,12 +263,55 @@ class DBManager:
         - params (tuple) : Les valeurs à insérer/modifier.
 
         ÉTAPES :
-        1. Utiliser un Context Manager (with self._get_connection() as conn).
+        1. Prendre self._write_lock (un seul écrivain à la fois dans le processus), puis
+           utiliser un Context Manager (with self._get_connection() as conn).
         2. Créer un curseur.
         3. Exécuter cursor.execute(query, params).
         4. La méthode __exit__ du Context Manager validera automatiquement le commit (conn.commit()).
            Si une erreur survient, elle fera un rollback.
         """
-        with self._get_connection() as conn:
+        with self._write_lock, self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
+
+    def execute_many(self, query: str, seq_of_params: list) -> None:
+        """
+        BUT :
+        Exécuter une même requête d'écriture pour une série de paramètres, en une seule
+        transaction (un seul commit au lieu d'un par ligne).
+
+        ARGUMENTS :
+        - query (str) : La requête SQL paramétrée.
+        - seq_of_params (list) : Liste de tuples de paramètres.
+
+        ÉTAPES :
+        1. Prendre self._write_lock puis utiliser un Context Manager (with self._get_connection() as conn).
+        2. Exécuter conn.executemany(query, seq_of_params).
+        3. Le Context Manager valide le commit une seule fois (ou rollback en cas d'erreur).
+        """
+        with self._write_lock, self._get_connection() as conn:
+            conn.executemany(query, seq_of_params)
+
+    def execute_batch(self, statements: list) -> None:
+        """
+        BUT :
+        Exécuter plusieurs requêtes d'écriture différentes en une seule transaction
+        (un seul commit, donc une seule synchronisation du WAL, et tout ou rien,
+        y compris pour les CREATE / DROP / ALTER TABLE).
+
+        ARGUMENTS :
+        - statements (list) : Liste de couples (query, params), exécutés dans l'ordre.
+
+        ÉTAPES :
+        1. Prendre self._write_lock puis utiliser un Context Manager (with self._get_connection() as conn).
+        2. Ouvrir explicitement la transaction (BEGIN IMMEDIATE) : le module sqlite3 ne l'ouvre
+           de lui-même qu'avant un INSERT/UPDATE/DELETE/REPLACE, un CREATE TABLE serait sinon
+           validé à part.
+        3. Exécuter chaque requête avec conn.execute(query, params).
+        4. Le Context Manager valide le commit une seule fois (ou rollback de toutes les requêtes en cas d'erreur).
+        """
+        with self._write_lock, self._get_connection() as conn:
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            for query, params in statements:
+                conn.execute(query, params)
@@ -1,5 +1,76 @@
+from datetime import datetime, timedelta, timezone
+
 import pandas as pd
 
+# Les timestamps sont stockés via datetime.isoformat() : on indique le format à pandas
+# pour rester sur le parseur C rapide (pas de repli dateutil élément par élément).
+TIMESTAMP_FORMAT = "ISO8601"
+
+
+# Requêtes figées (LIMIT toujours paramétré, -1 = sans limite) : une seule chaîne SQL par
+# table, donc réutilisable par le cache de statements de sqlite3.
+_PRODUCTIONS_SQL = "SELECT timestamp, production FROM Productions WHERE id = ? ORDER BY timestamp DESC LIMIT ?"
+_PRODUCTIONS_MEASURED_SQL = (
+    "SELECT timestamp, production FROM productions_measurements WHERE id = ? ORDER BY timestamp DESC LIMIT ?"
+)
+_TEMPERATURES_SQL = "SELECT timestamp, temperature FROM temperatures WHERE id = ? ORDER BY timestamp DESC LIMIT ?"
+_DECISIONS_SQL = "SELECT timestamp, decision FROM Decisions WHERE id = ? ORDER BY timestamp DESC LIMIT ?"
+# Bornes de plage : le texte ISO (élargi, pour les décalages horaires stockés) sert au parcours de
+# plage sur idx_temperatures_id_ts ; le filtre exact compare les instants ramenés en UTC par SQLite
+# (texte normalisé à la milliseconde). Deux ordres : celui de l'index (texte, sans tri) pour la
+# sonde, et l'ordre chronologique réel pour le résultat (voir get_temperatures_between).
+_TEMPERATURES_BETWEEN_SQL = """
+    SELECT timestamp, temperature, strftime('%Y-%m-%dT%H:%M:%f', timestamp) AS utc FROM temperatures
+    WHERE id = ? AND timestamp >= ? AND timestamp <= ? AND utc BETWEEN ? AND ?
+    ORDER BY {order} DESC LIMIT ?
+"""
+_TEMPERATURES_BY_TEXT_SQL = _TEMPERATURES_BETWEEN_SQL.format(order="timestamp")
+_TEMPERATURES_BY_INSTANT_SQL = _TEMPERATURES_BETWEEN_SQL.format(order="utc")
+# Bornes ouvertes : tout horodatage ISO (brut ou normalisé) est compris entre ces deux textes
+_MIN_TS = ""
+_MAX_TS = "9999"
+# Écart maximal entre le texte stocké et l'instant UTC (décalages horaires de -14 h à +14 h)
+_TS_TEXT_MARGIN = timedelta(days=1)
+# Arrondi des bornes exactes à la milliseconde (précision de strftime('%f')), vers l'extérieur
+_TS_ROUNDING = timedelta(milliseconds=1)
+
+
+def _utc_ms_text(value: datetime) -> str:
+    value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%dT%H:%M:%S.") + f"{value.microsecond // 1000:03d}"
+
+# Séries accessibles en tuples bruts (get_rows), par nom de table.
+_SERIES_SQL = {
+    "productions": _PRODUCTIONS_SQL,
+    "productions_measurements": _PRODUCTIONS_MEASURED_SQL,
+    "temperatures": _TEMPERATURES_SQL,
+    "decisions": _DECISIONS_SQL,
+}
+
+
+def _limit(number: int = None) -> int:
+    return -1 if number is None else number
+
+
+def _make_frame(results: list, column: str) -> pd.DataFrame:
+    """
+    BUT :
+    Construire le DataFrame indexé par 'Datetime' directement à partir des tuples SQL
+    (timestamp, valeur), sans passer par une colonne temporaire puis drop/set_index.
+
+    RETOUR :
+    - DataFrame avec une colonne `column` et un index 'Datetime' trié (UTC).
+    """
+    timestamps, values = zip(*results)
+    index = pd.DatetimeIndex(
+        pd.to_datetime(timestamps, utc=True, format=TIMESTAMP_FORMAT, cache=True),
+        name="Datetime",
+    )
+    df = pd.DataFrame({column: values}, index=index)
+    if not index.is_monotonic_increasing:
+        df = df.sort_index()
+    return df
+
 class Getter:
     def __init__(self, db_manager):
         """
@@ -30,8 +101,8 @@ class Getter:
 
         ÉTAPES :
         1. Construire la requête SQL de base : 
-           "SELECT timestamp, production FROM Productions WHERE id = ? ORDER BY timestamp DESC".
-        2. Si 'number' est défini, ajouter " LIMIT ?" à la requête.
+           "SELECT timestamp, production FROM Productions WHERE id = ? ORDER BY timestamp DESC LIMIT ?".
+        2. Passer 'number' en paramètre du LIMIT (-1 si None : pas de limite).
         3. Exécuter self.db_manager.execute_query().
         4. Si le résultat est vide, renvoyer un DataFrame vide avec les bonnes colonnes.
         5. Sinon, charger la liste de tuples dans un DataFrame Pandas.
@@ -39,23 +110,12 @@ class Getter:
         7. Trier le DataFrame par ordre chronologique (sort_values).
         8. Renvoyer le DF.
         """
-        base_query = "SELECT timestamp, production FROM Productions WHERE id = ? ORDER BY timestamp DESC"
-        params = (client_id,)
-        if number is not None:
-            base_query += " LIMIT ?"
-            params = (client_id, number)
-
-        results = self.db_manager.execute_query(base_query, params)
+        results = self.db_manager.execute_query(_PRODUCTIONS_SQL, (client_id, _limit(number)))
 
         if not results:
             return pd.DataFrame(columns=["Datetime", "production"])
 
-        df = pd.DataFrame(results, columns=["timestamp", "production"])
-        df["Datetime"] = pd.to_datetime(df["timestamp"], utc=True)
-        df = df.drop(columns=["timestamp"])
-        df = df[["Datetime", "production"]].sort_values("Datetime")
-        df = df.set_index("Datetime")
-        return df
+        return _make_frame(results, "production")
     
     def get_production_measured(self, client_id: int, number: int = None) -> pd.DataFrame:
         """
@@ -66,23 +126,12 @@ class Getter:
         1. Requête sur la table 'productions_measurements'.
         2. Logique identique à get_production_forecast (SELECT, LIMIT, conversion Pandas).
         """
-        base_query = "SELECT timestamp, production FROM productions_measurements WHERE id = ? ORDER BY timestamp DESC"
-        params = (client_id,)
-        if number is not None:
-            base_query += " LIMIT ?"
-            params = (client_id, number)
-
-        results = self.db_manager.execute_query(base_query, params)
+        results = self.db_manager.execute_query(_PRODUCTIONS_MEASURED_SQL, (client_id, _limit(number)))
 
         if not results:
             return pd.DataFrame(columns=["Datetime", "production"])
 
-        df = pd.DataFrame(results, columns=["timestamp", "production"])
-        df["Datetime"] = pd.to_datetime(df["timestamp"], utc=True)
-        df = df.drop(columns=["timestamp"])
-        df = df[["Datetime", "production"]].sort_values("Datetime")
-        df = df.set_index("Datetime")
-        return df
+        return _make_frame(results, "production")
 
     def get_temperatures(self, client_id: int, number: int = None) -> pd.DataFrame:
         """
@@ -93,23 +142,12 @@ class Getter:
         1. Requête sur la table 'temperatures'.
         2. Retourner un DataFrame ['Datetime', 'temperature'].
         """
-        base_query = "SELECT timestamp, temperature FROM temperatures WHERE id = ? ORDER BY timestamp DESC"
-        params = (client_id,)
-        if number is not None:
-            base_query += " LIMIT ?"
-            params = (client_id, number)
-
-        results = self.db_manager.execute_query(base_query, params)
+        results = self.db_manager.execute_query(_TEMPERATURES_SQL, (client_id, _limit(number)))
 
         if not results:
             return pd.DataFrame(columns=["Datetime", "temperature"])
 
-        df = pd.DataFrame(results, columns=["timestamp", "temperature"])
-        df["Datetime"] = pd.to_datetime(df["timestamp"], utc=True)
-        df = df.drop(columns=["timestamp"])
-        df = df[["Datetime", "temperature"]].sort_values("Datetime")
-        df = df.set_index("Datetime")
-        return df
+        return _make_frame(results, "temperature")
 
     def get_decisions(self, client_id: int, number: int = None) -> pd.DataFrame:
         """
@@ -120,20 +158,81 @@ class Getter:
         1. Requête sur la table 'Decisions'.
         2. Retourner un DataFrame ['Datetime', 'decision'].
         """
-        base_query = "SELECT timestamp, decision FROM Decisions WHERE id = ? ORDER BY timestamp DESC"
-        params = (client_id,)
-        if number is not None:
-            base_query += " LIMIT ?"
-            params = (client_id, number)
-
-        results = self.db_manager.execute_query(base_query, params)
+        results = self.db_manager.execute_query(_DECISIONS_SQL, (client_id, _limit(number)))
 
         if not results:
             return pd.DataFrame(columns=["Datetime", "decision"])
 
-        df = pd.DataFrame(results, columns=["timestamp", "decision"])
-        df["Datetime"] = pd.to_datetime(df["timestamp"], utc=True)
-        df = df.drop(columns=["timestamp"])
-        df = df[["Datetime", "decision"]].sort_values("Datetime")
-        df = df.set_index("Datetime")
-        return df
+        return _make_frame(results, "decision")
+
+    def get_rows(self, series: str, client_id: int, number: int = None) -> list:
+        """
+        BUT :
+        Récupérer les derniers points d'une série sous forme de tuples bruts (timestamp, valeur),
+        sans construire de DataFrame. Destiné aux réponses HTTP qui sérialisent directement.
+
+        ARGUMENTS :
+        - series : 'productions', 'productions_measurements', 'temperatures' ou 'decisions'.
+        - client_id : L'ID de l'utilisateur.
+        - number (int, optionnel) : Le nombre de points les plus récents (None = tout).
+
+        RETOUR :
+        - Liste de tuples (timestamp ISO str, valeur) en ordre chronologique.
+
+        ÉTAPES :
+        1. Choisir la requête figée de la série (KeyError si la série est inconnue).
+        2. Exécuter la requête (ordre décroissant + LIMIT) et inverser la liste.
+        """
+        results = self.db_manager.execute_query(_SERIES_SQL[series], (client_id, _limit(number)))
+        results.reverse()
+        return results
+
+    def get_temperatures_between(
+        self, client_id: int, start: datetime = None, end: datetime = None, number: int = None
+    ) -> list:
+        """
+        BUT :
+        Récupérer les températures dont l'horodatage est compris entre deux bornes, le filtre
+        et la limite étant appliqués par SQLite (seules les lignes utiles traversent la frontière Python).
+
+        ARGUMENTS :
+        - client_id : L'ID de l'utilisateur.
+        - start, end (datetime avec fuseau, optionnels) : Bornes incluses (None = ouverte).
+        - number (int, optionnel) : Le nombre de points les plus récents dans la plage (None = tout).
+
+        RETOUR :
+        - Liste de tuples (timestamp ISO str, température) en ordre chronologique. Les bornes exactes
+          étant arrondies à la milliseconde vers l'extérieur, l'appelant refait le filtre fin s'il
+          a besoin de la microseconde.
+
+        ÉTAPES :
+        1. Calculer les bornes texte élargies (index) et les bornes UTC normalisées (filtre exact).
+        2. Avec une limite N, sonder les N lignes les plus récentes dans l'ordre de l'index : leur plus
+           ancien instant T0 minore le N-ième instant réel. Les N lignes cherchées ont donc un texte
+           postérieur à T0 - marge : la plage texte est resserrée d'autant (lecture bornée même sans
+           borne basse).
+        3. Exécuter la requête finale triée sur l'instant UTC (LIMIT appliqué par SQLite).
+        4. Remettre en ordre chronologique et ne garder que (timestamp, température).
+        """
+        lo_text = _utc_ms_text(start - _TS_TEXT_MARGIN) if start else _MIN_TS
+        hi_text = _utc_ms_text(end + _TS_TEXT_MARGIN) if end else _MAX_TS
+        lo_utc = _utc_ms_text(start - _TS_ROUNDING) if start else _MIN_TS
+        hi_utc = _utc_ms_text(end + _TS_ROUNDING) if end else _MAX_TS
+        limit = _limit(number)
+
+        if limit >= 0:
+            probe = self.db_manager.execute_query(
+                _TEMPERATURES_BY_TEXT_SQL, (client_id, lo_text, hi_text, lo_utc, hi_utc, limit)
+            )
+            if len(probe) < limit:
+                # Moins de N lignes dans toute la plage : la sonde les contient toutes
+                return [row[:2] for row in sorted(probe, key=lambda row: row[2])]
+            if probe:
+                oldest = datetime.fromisoformat(min(row[2] for row in probe)).replace(tzinfo=timezone.utc)
+                lo_text = max(lo_text, _utc_ms_text(oldest - _TS_TEXT_MARGIN))
+
+        results = self.db_manager.execute_query(
+            _TEMPERATURES_BY_INSTANT_SQL, (client_id, lo_text, hi_text, lo_utc, hi_utc, limit)
+        )
+        results.reverse()
+        return [row[:2] for row in results]
@@ -1,3 +1,27 @@
+# Requêtes préparées une seule fois au chargement du module : la chaîne SQL est
+# identique d'un appel à l'autre, ce qui permet au cache de statements de sqlite3 de servir.
+_UPSERT_TEMPERATURE_SQL = """
+    INSERT INTO temperatures (id, temperature, timestamp)
+    VALUES (?, ?, ?)
+    ON CONFLICT(id, timestamp) DO UPDATE SET
+        temperature = excluded.temperature
+"""
+_REPLACE_PRODUCTION_FORECAST_SQL = "INSERT OR REPLACE INTO Productions (id, timestamp, production) VALUES (?, ?, ?)"
+_UPSERT_PRODUCTION_MEASURED_SQL = """
+    INSERT INTO productions_measurements (id, production, timestamp)
+    VALUES (?, ?, ?)
+    ON CONFLICT(id, timestamp) DO UPDATE SET
+        production = excluded.production
+"""
+_REPLACE_DECISION_TAKEN_SQL = "INSERT OR REPLACE INTO Decisions (id, timestamp, decision) VALUES (?, ?, ?)"
+_UPSERT_DECISION_MEASURED_SQL = """
+    INSERT INTO decisions_measurements (id, decision, timestamp)
+    VALUES (?, ?, ?)
+    ON CONFLICT(id, timestamp) DO UPDATE SET
+        decision = excluded.decision
+"""
+
+
 class Reporter:
     def __init__(self, db_manager):
         """
@@ -29,13 +53,7 @@ class Reporter:
            On peut laisser planter ou catcher l'erreur selon la stratégie voulue.
         """
         ts = time.isoformat() if hasattr(time, "isoformat") else str(time)
-        query = """
-            INSERT INTO temperatures (id, temperature, timestamp)
-            VALUES (?, ?, ?)
-            ON CONFLICT(id, timestamp) DO UPDATE SET
-                temperature = excluded.temperature
-        """
-        self.db_manager.execute_commit(query, (client_id, temperature, ts))
+        self.db_manager.execute_commit(_UPSERT_TEMPERATURE_SQL, (client_id, temperature, ts))
     
     def report_production_forecast(self, client_id: int, production_forecast: float, time: str) -> None:
         """
@@ -53,8 +71,7 @@ class Reporter:
         2. Appeler self.db_manager.execute_commit(...).
         """
         ts = time.isoformat() if hasattr(time, "isoformat") else str(time)
-        query = "INSERT OR REPLACE INTO Productions (id, timestamp, production) VALUES (?, ?, ?)"
-        self.db_manager.execute_commit(query, (client_id, ts, production_forecast))
+        self.db_manager.execute_commit(_REPLACE_PRODUCTION_FORECAST_SQL, (client_id, ts, production_forecast))
     
     def report_production_measured(self, client_id: int, production_measured: float, time: str) -> None:
         """
@@ -67,13 +84,7 @@ class Reporter:
         2. Exécution via db_manager.
         """
         ts = time.isoformat() if hasattr(time, "isoformat") else str(time)
-        query = """
-            INSERT INTO productions_measurements (id, production, timestamp)
-            VALUES (?, ?, ?)
-            ON CONFLICT(id, timestamp) DO UPDATE SET
-                production = excluded.production
-        """
-        self.db_manager.execute_commit(query, (client_id, production_measured, ts))
+        self.db_manager.execute_commit(_UPSERT_PRODUCTION_MEASURED_SQL, (client_id, production_measured, ts))
     
     def report_decision_taken(self, client_id: int, decision: float, time: str) -> None:
         """
@@ -86,8 +97,7 @@ class Reporter:
         2. Exécution via db_manager.
         """
         ts = time.isoformat() if hasattr(time, "isoformat") else str(time)
-        query = "INSERT OR REPLACE INTO Decisions (id, timestamp, decision) VALUES (?, ?, ?)"
-        self.db_manager.execute_commit(query, (client_id, decision, ts))
+        self.db_manager.execute_commit(_REPLACE_DECISION_TAKEN_SQL, (client_id, ts, decision))
     
     def report_decision_measured(self, client_id: int, decision: float, time: str) -> None:
         """
@@ -101,10 +111,4 @@ class Reporter:
         2. Exécution via db_manager.
         """
         ts = time.isoformat() if hasattr(time, "isoformat") else str(time)
-        query = """
-            INSERT INTO decisions_measurements (id, decision, timestamp)
-            VALUES (?, ?, ?)
-            ON CONFLICT(id, timestamp) DO UPDATE SET
-                decision = excluded.decision
-        """
-        self.db_manager.execute_commit(query, (client_id, decision, ts))
+        self.db_manager.execute_commit(_UPSERT_DECISION_MEASURED_SQL, (client_id, decision, ts))
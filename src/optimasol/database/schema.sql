@@ -114,6 +114,7 @@ CREATE TABLE IF NOT EXISTS users_auth (
 );
 
 -- ========== ui_sessions ==========
+-- Sans rowid : la recherche par token lit la ligne directement dans le B-tree de la clé.
 CREATE TABLE IF NOT EXISTS ui_sessions (
     token      TEXT PRIMARY KEY,
     user_id    INTEGER NOT NULL,
@@ -123,4 +124,35 @@ CREATE TABLE IF NOT EXISTS ui_sessions (
     FOREIGN KEY (user_id) REFERENCES users_auth(id)
         ON UPDATE CASCADE
         ON DELETE CASCADE
-);
+) WITHOUT ROWID;
+
+-- ========== Index couvrants (séries temporelles) ==========
+-- (id, timestamp DESC, valeur) : "dernière valeur" et historiques récents se lisent
+-- directement dans l'index, sans accès à la table ni tri.
+CREATE INDEX IF NOT EXISTS idx_temperatures_id_ts
+    ON temperatures (id, timestamp DESC, temperature);
+CREATE INDEX IF NOT EXISTS idx_productions_id_ts
+    ON Productions (id, timestamp DESC, production);
+CREATE INDEX IF NOT EXISTS idx_decisions_id_ts
+    ON Decisions (id, timestamp DESC, decision);
+CREATE INDEX IF NOT EXISTS idx_productions_measurements_id_ts
+    ON productions_measurements (id, timestamp DESC, production);
+CREATE INDEX IF NOT EXISTS idx_decisions_measurements_id_ts
+    ON decisions_measurements (id, timestamp DESC, decision);
+
+-- ========== Index sur le numéro de série du driver ==========
+-- Même expression que la requête de unicité de l'interface web (json_valid protège
+-- des config_driver non JSON, sur lesquelles json_extract lèverait une erreur).
+CREATE INDEX IF NOT EXISTS idx_users_main_serial
+    ON users_main (
+        (CASE WHEN json_valid(config_driver) THEN json_extract(config_driver, '$.serial_number') END)
+    );
+
+-- ========== Index de l'interface web (authentification) ==========
+-- Clés étrangères (recherche du compte d'un client, cascades) et purge des sessions expirées.
+CREATE INDEX IF NOT EXISTS idx_users_auth_client_id
+    ON users_auth (client_id);
+CREATE INDEX IF NOT EXISTS idx_ui_sessions_user_id
+    ON ui_sessions (user_id);
+CREATE INDEX IF NOT EXISTS idx_ui_sessions_expires
+    ON ui_sessions (expires_at);
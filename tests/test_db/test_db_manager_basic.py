@@ -1,4 +1,7 @@
 import datetime as dt
+import gc
+import sqlite3
+import threading
 from pathlib import Path
 
 import pytest
@@ -94,3 +97,112 @@ def test_report_and_getters_roundtrip(tmp_path: Path):
     decisions = mgr.get_decisions_taken(42)
     assert not decisions.empty
     assert pytest.approx(decisions.iloc[-1]["decision"]) == 0.8
+
+
+def _run_in_thread(func):
+    thread = threading.Thread(target=func)
+    thread.start()
+    thread.join()
+    gc.collect()
+
+
+def test_thread_connection_closed_when_thread_exits(tmp_path: Path):
+    mgr = DBManager(tmp_path / "db_threads.db")
+    opened = []
+
+    def worker():
+        mgr.execute_commit(
+            "INSERT OR IGNORE INTO Drivers (driver_id, nom_driver) VALUES (?, ?)", (1, "unit")
+        )
+        opened.append(mgr._local.connections.conn)
+
+    _run_in_thread(worker)
+
+    assert opened and not mgr._connections
+    with pytest.raises(sqlite3.ProgrammingError):
+        opened[0].execute("SELECT 1")
+
+
+def test_reader_and_writer_share_the_thread_registry(tmp_path: Path):
+    mgr = DBManager(tmp_path / "db_threads_rw.db")
+    main_conn = mgr._get_connection(readonly=True)
+    opened = []
+    registered = []
+
+    def worker():
+        mgr.execute_query("SELECT 1")
+        mgr.execute_commit(
+            "INSERT OR IGNORE INTO Drivers (driver_id, nom_driver) VALUES (?, ?)", (1, "unit")
+        )
+        holder = mgr._local.connections
+        opened.extend([holder.ro_conn, holder.conn])
+        registered.append(set(opened) <= mgr._connections)
+
+    _run_in_thread(worker)
+
+    assert registered == [True]
+    # Seule la connexion du thread principal, toujours vivant, reste enregistrée
+    assert mgr._connections == {main_conn}
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+    mgr.close()
+    assert not mgr._connections
+    with pytest.raises(sqlite3.ProgrammingError):
+        main_conn.execute("SELECT 1")
+
+
+def test_execute_batch_rolls_back_ddl(tmp_path: Path):
+    mgr = DBManager(tmp_path / "db_batch.db")
+
+    with pytest.raises(sqlite3.OperationalError):
+        mgr.execute_batch([
+            ("CREATE TABLE batch_new (x INTEGER);", ()),
+            ("INSERT INTO batch_new (x) VALUES (?);", (1,)),
+            ("INSERT INTO missing_table (x) VALUES (?);", (1,)),
+        ])
+
+    tables = {row[0] for row in mgr.execute_query("SELECT name FROM sqlite_master WHERE type='table'")}
+    assert "batch_new" not in tables
+
+    mgr.execute_batch([
+        ("CREATE TABLE batch_new (x INTEGER);", ()),
+        ("INSERT INTO batch_new (x) VALUES (?);", (1,)),
+    ])
+    assert mgr.execute_query("SELECT x FROM batch_new") == [(1,)]
+
+
+def test_temperatures_between_applies_range_and_limit_in_sql(tmp_path: Path):
+    mgr = DBManager(tmp_path / "db_between.db")
+    _insert_minimal_client(mgr, client_id=7)
+    utc = dt.timezone.utc
+    plus2 = dt.timezone(dt.timedelta(hours=2))
+    base = dt.datetime(2026, 1, 10, 12, 0, tzinfo=utc)
+    # Un point par heure, une partie stockée avec un décalage +02:00
+    rows = []
+    for hour in range(-30, 31):
+        ts = base + dt.timedelta(hours=hour)
+        stored = ts.astimezone(plus2) if hour % 2 else ts
+        rows.append((7, stored.isoformat(), float(hour)))
+    mgr.execute_many("INSERT INTO temperatures (id, timestamp, temperature) VALUES (?, ?, ?)", rows)
+
+    # Borne haute seule : les 3 derniers points jusqu'à "base" inclus, sans ceux de la marge d'un jour
+    real_query = mgr.execute_query
+    seen_params = []
+
+    def recording_query(query, params=()):
+        seen_params.append(params)
+        return real_query(query, params)
+
+    mgr.execute_query = recording_query
+    latest = mgr.getter.get_temperatures_between(7, end=base, number=3)
+    mgr.execute_query = real_query
+    assert [value for _, value in latest] == [-2.0, -1.0, 0.0]
+    # Requête finale bornée en bas malgré l'absence de "start", et LIMIT transmis à SQLite
+    assert seen_params[-1][1] > "2026-01-08" and seen_params[-1][-1] == 3
+
+    window = mgr.getter.get_temperatures_between(
+        7, start=base - dt.timedelta(hours=1), end=base + dt.timedelta(hours=1)
+    )
+    assert [value for _, value in window] == [-1.0, 0.0, 1.0]
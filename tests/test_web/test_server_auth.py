@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from optimasol.database import DBManager
+from web import server
+
+
+def _request(ip: str = "10.0.0.1", token: str | None = None) -> Request:
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": headers, "client": (ip, 0)})
+
+
+def _web_db(tmp_path: Path, password_hash: str = "unused") -> tuple[DBManager, int]:
+    """Base neuve avec un client (id 1) et son compte d'interface."""
+    db = DBManager(tmp_path / "web.db")
+    server._ensure_users_tables(db)
+    db.execute_batch([
+        ("INSERT INTO Drivers (driver_id, nom_driver) VALUES (1, 'unit');", ()),
+        ("INSERT INTO users_main (id, config_engine, config_weather, driver_id, config_driver) "
+         "VALUES (1, '', '', 1, '');", ()),
+        ("INSERT INTO users_auth (email, name, password_hash, client_id, created_at) VALUES (?, ?, ?, 1, ?);",
+         ("user@example.com", "User", password_hash, server._now_iso())),
+    ])
+    user_id = db.execute_query("SELECT id FROM users_auth WHERE email = ?", ("user@example.com",))[0][0]
+    return db, user_id
+
+
+@pytest.fixture(autouse=True)
+def _fresh_state(monkeypatch):
+    monkeypatch.setattr(server, "_SESSION_CACHE", {})
+    monkeypatch.setattr(server, "_SESSION_REVOKED", {})
+    monkeypatch.setattr(server, "_SCHEMA_VERSIONS", {})
+    monkeypatch.setattr(server, "_RATE_BUCKETS", {})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Horloge monotone pilotée par le test (server.time.monotonic)."""
+    now = [1000.0]
+    monkeypatch.setattr(server.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_signup_limit_survives_sweep_triggered_by_login(clock):
+    req = _request()
+    max_hits, _ = server.SIGNUP_RATE_LIMIT
+    for _ in range(max_hits):
+        server._check_rate(req, "signup", server.SIGNUP_RATE_LIMIT)
+
+    # Plus d'une fenêtre "login" plus tard, mais toujours dans la fenêtre "signup"
+    clock[0] += server.LOGIN_RATE_LIMIT[1] + 1
+    # Des appels login depuis d'autres adresses portent le registre à 256 compteurs :
+    # le suivant déclenche la purge périodique.
+    other = 0
+    while len(server._RATE_BUCKETS) < 256:
+        other += 1
+        server._check_rate(_request(f"10.1.{other // 256}.{other % 256}"), "login", server.LOGIN_RATE_LIMIT)
+    server._check_rate(_request("10.2.0.1"), "login", server.LOGIN_RATE_LIMIT)
+
+    with pytest.raises(HTTPException) as exc:
+        server._check_rate(req, "signup", server.SIGNUP_RATE_LIMIT)
+    assert exc.value.status_code == 429
+
+
+def test_rate_bucket_resets_after_its_window(clock):
+    req = _request()
+    max_hits, window = server.LOGIN_RATE_LIMIT
+    for _ in range(max_hits):
+        server._check_rate(req, "login", server.LOGIN_RATE_LIMIT)
+    with pytest.raises(HTTPException):
+        server._check_rate(req, "login", server.LOGIN_RATE_LIMIT)
+
+    clock[0] += window + 1
+    server._check_rate(req, "login", server.LOGIN_RATE_LIMIT)
+
+
+def test_rowid_ui_sessions_migrated_with_live_sessions(tmp_path):
+    db, user_id = _web_db(tmp_path)
+    # Table au format d'avant WITHOUT ROWID, et reste d'une reconstruction interrompue
+    db.execute_batch([
+        ("DROP TABLE ui_sessions;", ()),
+        ("""CREATE TABLE ui_sessions (
+                token TEXT PRIMARY KEY, user_id INTEGER NOT NULL,
+                created_at TEXT NOT NULL, expires_at TEXT NOT NULL,
+                FOREIGN KEY (user_id) REFERENCES users_auth(id) ON UPDATE CASCADE ON DELETE CASCADE
+            );""", ()),
+        ("CREATE TABLE ui_sessions_new (token TEXT);", ()),
+    ])
+    token = server._new_session(db, user_id, 1)
+    assert server._has_rowid(db, "ui_sessions")
+
+    server._SCHEMA_VERSIONS.clear()
+    server._SESSION_CACHE.clear()
+    server._ensure_users_tables(db)
+
+    assert not server._has_rowid(db, "ui_sessions")
+    tables = {row[0] for row in db.execute_query("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "ui_sessions_new" not in tables
+    indexes = {row[1] for row in db.execute_query("PRAGMA index_list('ui_sessions')")}
+    assert {"idx_ui_sessions_user_id", "idx_ui_sessions_expires"} <= indexes
+    assert server._session_entry(_request(token=token), db)["user_id"] == user_id
+
+
+def test_password_change_revokes_other_cached_sessions(tmp_path, monkeypatch):
+    db, user_id = _web_db(tmp_path, server._hash_password("ancien-motdepasse"))
+    monkeypatch.setattr(server, "_db", lambda: db)
+    current = server._new_session(db, user_id, 1)
+    other = server._new_session(db, user_id, 1)
+    # Les deux sessions sont en cache (profil compris)
+    server.me(_request(token=current))
+    server.me(_request(token=other))
+
+    payload = server.PasswordChangePayload(
+        current_password="ancien-motdepasse",
+        new_password="nouveau-motdepasse",
+        new_password_confirm="nouveau-motdepasse",
+    )
+    assert server.password_change(_request(token=current), payload) == {"status": "ok"}
+
+    with pytest.raises(HTTPException) as exc:
+        server._session_entry(_request(token=other), db)
+    assert exc.value.status_code == 401
+    assert server._session_entry(_request(token=current), db)["user_id"] == user_id
+
+
+def test_lookup_racing_password_change_is_not_cached(tmp_path, monkeypatch):
+    db, user_id = _web_db(tmp_path, server._hash_password("ancien-motdepasse"))
+    monkeypatch.setattr(server, "_db", lambda: db)
+    current = server._new_session(db, user_id, 1)
+    other = server._new_session(db, user_id, 1)
+    server._SESSION_CACHE.pop(other)
+    payload = server.PasswordChangePayload(
+        current_password="ancien-motdepasse",
+        new_password="nouveau-motdepasse",
+        new_password_confirm="nouveau-motdepasse",
+    )
+
+    # La vérification de "other" lit sa ligne en base, puis le changement de mot de passe
+    # s'exécute entièrement avant qu'elle ne tente de la mettre en cache.
+    real_query = db.execute_query
+    raced = []
+
+    def racing_query(query, params=()):
+        rows = real_query(query, params)
+        if query == server._SESSION_LOOKUP_SQL and params == (other,) and not raced:
+            raced.append(True)
+            server.password_change(_request(token=current), payload)
+        return rows
+
+    monkeypatch.setattr(db, "execute_query", racing_query)
+    server._session_entry(_request(token=other), db)
+    assert raced
+
+    assert other not in server._SESSION_CACHE
+    with pytest.raises(HTTPException) as exc:
+        server._session_entry(_request(token=other), db)
+    assert exc.value.status_code == 401
+
+
+def test_logout_is_not_undone_by_a_racing_lookup(tmp_path, monkeypatch):
+    db, user_id = _web_db(tmp_path)
+    monkeypatch.setattr(server, "_db", lambda: db)
+    token = server._new_session(db, user_id, 1)
+    server._SESSION_CACHE.pop(token)
+
+    real_query = db.execute_query
+    raced = []
+
+    def racing_query(query, params=()):
+        rows = real_query(query, params)
+        if query == server._SESSION_LOOKUP_SQL and not raced:
+            raced.append(True)
+            server.logout(_request(token=token))
+        return rows
+
+    monkeypatch.setattr(db, "execute_query", racing_query)
+    server._session_entry(_request(token=token), db)
+
+    assert token not in server._SESSION_CACHE
+    with pytest.raises(HTTPException):
+        server._session_entry(_request(token=token), db)
+
+
+def test_login_caches_the_new_session(tmp_path, monkeypatch):
+    db, user_id = _web_db(tmp_path, server._hash_password("motdepasse"))
+    monkeypatch.setattr(server, "_db", lambda: db)
+
+    token = server.login(_request(), server.LoginPayload(email="user@example.com", password="motdepasse"))["token"]
+
+    entry = server._SESSION_CACHE[token]
+    assert (entry["user_id"], entry["client_id"]) == (user_id, 1)
+    assert time.time() < entry["valid_until"] <= time.time() + server.SESSION_CACHE_TTL_SECONDS
+    # Première requête authentifiée servie par le cache, sans relire la jointure
+    monkeypatch.setattr(db, "execute_query", lambda *_args: pytest.fail("session relue en base"))
+    assert server._session_entry(_request(token=token), db) is entry
+
+
+def test_session_created_during_revocation_is_not_cached(tmp_path):
+    db, user_id = _web_db(tmp_path)
+    real_commit = db.execute_commit
+
+    def revoking_commit(query, params=()):
+        real_commit(query, params)
+        # Changement de mot de passe concurrent, juste après l'écriture de la session
+        server._revoke_sessions(user_id)
+
+    db.execute_commit = revoking_commit
+    token = server._new_session(db, user_id, 1)
+
+    assert token not in server._SESSION_CACHE
+
+
+def test_session_cache_stays_bounded_under_concurrent_writers(monkeypatch):
+    monkeypatch.setattr(server, "SESSION_CACHE_MAX_ENTRIES", 300)
+    errors = []
+
+    def writer(user_id):
+        try:
+            for i in range(2000):
+                entry = {"user_id": user_id, "client_id": 1, "valid_until": time.time() + 60}
+                server._cache_session(f"{user_id}-{i}", entry)
+                if i % 100 == 0:
+                    server._revoke_sessions(user_id)
+        except Exception as exc:  # noqa: BLE001
+            errors.append(exc)
+
+    threads = [threading.Thread(target=writer, args=(uid,)) for uid in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(server._SESSION_CACHE) < server.SESSION_CACHE_MAX_ENTRIES
+
+
+def _legacy_hash(password: str, salt: str = "legacysalt") -> str:
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), server._LEGACY_PBKDF2_ROUNDS)
+    return f"{salt}${digest.hex()}"
+
+
+def _stored_hash(db: DBManager, user_id: int) -> str:
+    return db.execute_query("SELECT password_hash FROM users_auth WHERE id = ?", (user_id,))[0][0]
+
+
+def test_login_with_legacy_pbkdf2_hash_rehashes_to_argon2id(tmp_path, monkeypatch):
+    db, user_id = _web_db(tmp_path, _legacy_hash("motdepasse-legacy"))
+    monkeypatch.setattr(server, "_db", lambda: db)
+
+    result = server.login(_request(), server.LoginPayload(email="user@example.com", password="motdepasse-legacy"))
+
+    assert server._session_entry(_request(token=result["token"]), db)["user_id"] == user_id
+    stored = _stored_hash(db, user_id)
+    assert stored.startswith("$argon2id$")
+    assert server._verify_password("motdepasse-legacy", stored)
+
+
+def test_wrong_password_against_legacy_hash_is_not_rehashed(tmp_path, monkeypatch):
+    legacy = _legacy_hash("motdepasse-legacy")
+    db, user_id = _web_db(tmp_path, legacy)
+    monkeypatch.setattr(server, "_db", lambda: db)
+
+    with pytest.raises(HTTPException) as exc:
+        server.login(_request(), server.LoginPayload(email="user@example.com", password="mauvais"))
+
+    assert exc.value.status_code == 401
+    assert _stored_hash(db, user_id) == legacy
+
+
+def test_unknown_email_still_runs_dummy_verify(tmp_path, monkeypatch):
+    db, _ = _web_db(tmp_path)
+    monkeypatch.setattr(server, "_db", lambda: db)
+    calls = []
+    real_dummy_verify = server._dummy_verify
+
+    def counting_dummy_verify(password):
+        calls.append(password)
+        return real_dummy_verify(password)
+
+    monkeypatch.setattr(server, "_dummy_verify", counting_dummy_verify)
+
+    with pytest.raises(HTTPException) as exc:
+        server.login(_request(), server.LoginPayload(email="inconnu@example.com", password="peu-importe"))
+
+    assert exc.value.status_code == 401
+    assert calls == ["peu-importe"]
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from optimasol.core.all_clients import AllClients
+from optimasol.database import DBManager
+from optimasol.database.client_manager import _UPSERT_CLIENT_SQL
+from web import server
+
+
+@pytest.fixture(autouse=True)
+def _fresh_state(monkeypatch):
+    monkeypatch.setattr(server, "_SCHEMA_VERSIONS", {})
+
+
+def _insert_client(db: DBManager, client_id: int, serial: str | None) -> None:
+    config_driver = json.dumps({"serial_number": serial} if serial else {})
+    db.execute_batch([
+        ("INSERT OR IGNORE INTO Drivers (driver_id, nom_driver) VALUES (1, 'unit');", ()),
+        (_UPSERT_CLIENT_SQL, (client_id, None, "", "", 1, config_driver)),
+    ])
+
+
+def _indexes(db: DBManager) -> set:
+    return {row[1] for row in db.execute_query("PRAGMA index_list('users_main')")}
+
+
+def test_serial_unique_index_turns_racing_duplicate_into_409(tmp_path: Path, monkeypatch):
+    db = DBManager(tmp_path / "clients.db")
+    _insert_client(db, 1, "SN-1")
+    server._ensure_users_tables(db)
+    assert server._SERIAL_UNIQUE_INDEX in _indexes(db)
+
+    # Écriture d'un second client avec le même numéro, comme après une vérification concurrente
+    monkeypatch.setattr(db.client_manager, "store_all_clients", lambda _clients: _insert_client(db, 2, "SN-1"))
+    with pytest.raises(HTTPException) as exc:
+        server._store_clients(db, object())
+    assert exc.value.status_code == 409
+    assert db.execute_query("SELECT id FROM users_main ORDER BY id") == [(1,)]
+
+
+def test_serial_unique_index_skipped_when_duplicates_exist(tmp_path: Path):
+    db = DBManager(tmp_path / "clients_dup.db")
+    _insert_client(db, 1, "SN-1")
+    _insert_client(db, 2, "SN-1")
+
+    server._ensure_users_tables(db)
+
+    assert server._SERIAL_UNIQUE_INDEX not in _indexes(db)
+    with pytest.raises(HTTPException) as exc:
+        server._ensure_unique_serial(db, "SN-1", exclude_client_id=3)
+    assert exc.value.status_code == 409
+
+
+class _Located:
+    """Client réduit à ce que lit le calcul des leaders (id et position), comparé par identité."""
+
+    def __init__(self, client_id: int, latitude: float, longitude: float):
+        self.client_id = client_id
+        position = SimpleNamespace(latitude=latitude, longitude=longitude)
+        self.client_weather = SimpleNamespace(position=position)
+
+
+def _fleet() -> tuple[AllClients, _Located, _Located, _Located]:
+    """Client 1 leader suivi par le client 2 (à ~100 m), client 3 leader seul à ~300 km."""
+    leader, follower, lone = _Located(1, 45.0, 5.0), _Located(2, 45.0009, 5.0), _Located(3, 48.0, 2.0)
+    all_clients = AllClients()
+    all_clients.list_of_clients = [leader, follower, lone]
+    all_clients.clients_with_leaders = [(leader, leader), (follower, leader), (lone, lone)]
+    all_clients.leaders = [leader, lone]
+    return all_clients, leader, follower, lone
+
+
+def test_replace_follower_matches_it_against_the_other_leaders():
+    all_clients, leader, follower, lone = _fleet()
+    moved = _Located(2, 48.0009, 2.0)
+
+    server._replace_client(all_clients, moved)
+
+    assert all_clients.clients_with_leaders == [(leader, leader), (moved, lone), (lone, lone)]
+    assert all_clients.leaders == [leader, lone]
+    assert all_clients.which_client_by_id(2) is moved
+
+
+def test_replace_leader_with_followers_keeps_it_leader():
+    all_clients, leader, follower, lone = _fleet()
+    # Même déplacé à ~300 km d'un autre leader, il reste le leader de son suiveur
+    moved = _Located(1, 48.0009, 2.0)
+
+    server._replace_client(all_clients, moved)
+
+    assert all_clients.clients_with_leaders == [(moved, moved), (follower, moved), (lone, lone)]
+    assert all_clients.leaders == [moved, lone]
+
+
+def test_replace_lone_leader_within_minimal_distance_becomes_follower():
+    all_clients, leader, follower, lone = _fleet()
+    moved = _Located(3, 45.0, 5.0009)
+    assert AllClients.MINIMAL_DISTANCE > 0.1
+
+    server._replace_client(all_clients, moved)
+
+    assert all_clients.clients_with_leaders == [(leader, leader), (follower, leader), (moved, leader)]
+    assert all_clients.leaders == [leader]
+
+
+def test_replace_lone_leader_beyond_minimal_distance_stays_leader():
+    all_clients, leader, follower, lone = _fleet()
+    # ~2 km du leader 1 : au-delà de MINIMAL_DISTANCE (1 km)
+    moved = _Located(3, 45.018, 5.0)
+
+    server._replace_client(all_clients, moved)
+
+    assert all_clients.clients_with_leaders == [(leader, leader), (follower, leader), (moved, moved)]
+    assert all_clients.leaders == [leader, moved]
+
+
+@pytest.mark.parametrize(
+    ("existing", "expected"),
+    [((), 1), ((2, 3), 1), ((1, 2, 3), 4), ((1, 3), 2)],
+)
+def test_next_client_id_takes_the_first_free_id(tmp_path: Path, existing, expected):
+    db = DBManager(tmp_path / "next_id.db")
+    for client_id in existing:
+        _insert_client(db, client_id, None)
+
+    assert server._next_client_id(db) == expected
+
+
+def test_history_body_is_the_json_object_of_all_series():
+    rows = {"temperatures": [("t0", 20.5), ("t1", 21.0)], "decisions": [("t0", 1)]}
+    db = SimpleNamespace(getter=SimpleNamespace(get_rows=lambda series, _cid, _n: rows.get(series, [])))
+
+    body = json.loads(server._history_body(db, 1))
+
+    assert list(body) == ["temperatures", "production_measured", "decisions", "production_forecast"]
+    assert body["temperatures"] == [{"temperature": 20.5}, {"temperature": 21.0}]
+    assert body["decisions"] == [{"decision": 1}]
+    assert body["production_forecast"] == []
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from web import server
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        ("gzip, deflate, br", ["br", "gzip"]),
+        ("br;q=0, gzip", ["gzip"]),
+        ("gzip;q=0.5, br;q=0.8", ["br", "gzip"]),
+        ("br;q=0.2, gzip;q=0.9", ["gzip", "br"]),
+        ("x-gzip, brotli", []),
+        ("*", ["br", "gzip"]),
+        ("*;q=0.5, br;q=0", ["gzip"]),
+        ("identity", []),
+        ("", []),
+    ],
+)
+def test_precompressed_for_parses_codings_and_q_values(header, expected):
+    assert [encoding for encoding, _ in server._precompressed_for(header)] == expected
+
+
+def _get(static: server.CachingStaticFiles, path: str, accept_encoding: str, query: bytes = b""):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": f"/static/{path}",
+        "query_string": query,
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    return asyncio.run(static.get_response(path, scope))
+
+
+def test_static_serves_accepted_variant_and_caches_versioned_urls(tmp_path: Path):
+    (tmp_path / "app.js").write_text("console.log(1);")
+    (tmp_path / "app.js.br").write_bytes(b"br-bytes")
+    static = server.CachingStaticFiles(directory=tmp_path)
+
+    response = _get(static, "app.js", "gzip, br", b"v=123")
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["cache-control"] == server.STATIC_IMMUTABLE_CACHE
+
+    # br refusé (q=0) et paramètre dont le nom contient seulement "v=" : fichier brut, revalidé
+    response = _get(static, "app.js", "br;q=0, gzip", b"nav=1")
+    assert "content-encoding" not in response.headers
+    assert response.headers["cache-control"] == "no-cache"
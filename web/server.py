@@ -1,35 +1,111 @@
 from __future__ import annotations
 
+import asyncio
 import base64
 import hashlib
 import hmac
 import json
+import logging
+import mimetypes
 import os
+import re
 import secrets
+import signal
 import smtplib
+import sqlite3
+import stat
+import threading
+import time
 from collections import deque
-from copy import deepcopy
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
 from email.message import EmailMessage
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Annotated, Any, Dict, List, Optional
+from urllib.parse import parse_qs
 
 import pandas as pd
-from fastapi import FastAPI, HTTPException, Request
+from anyio import to_thread
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, EmailStr, validator
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, EmailStr, StringConstraints, model_validator
+from starlette.datastructures import Headers
+from starlette.staticfiles import NotModifiedResponse
 
+from optimasol.cli import _build_client_from_json as _build_client
 from optimasol.database import DBManager
+from optimasol.drivers import ALL_DRIVERS
 from optimasol.default import DEFAULT_DB_PATH, LOG_FILE, PID_FILE, PROJECT_ROOT
 from optimasol.logging_setup import setup_logging
 from optimasol.config_loader import load_config_file
-from optimasol.core import AllClients
+
+try:  # orjson (optionnel) : sérialisation JSON nettement plus rapide sur les gros historiques
+    import orjson
+    from fastapi.responses import ORJSONResponse as JSONResponseClass
+except ImportError:  # pragma: no cover - repli sur le json standard
+    orjson = None
+    from fastapi.responses import JSONResponse as JSONResponseClass
 
 
 setup_logging()
-app = FastAPI(title="Optimasol GUI API")
+logger = logging.getLogger(__name__)
+
+# Période de la purge des inscriptions en attente et des sessions expirées (tâche de fond du lifespan)
+CLEANUP_INTERVAL_SECONDS = 60
+
+
+def _http_threads() -> int:
+    # Taille du pool de threads des routes synchrones (surchargeable par variable d'environnement).
+    raw = os.environ.get("OPTIMASOL_HTTP_THREADS")
+    try:
+        value = int(raw) if raw else 0
+    except ValueError:
+        value = 0
+    return value if value > 0 else min(32, (os.cpu_count() or 1) * 4)
+
+
+def _purge_expired() -> None:
+    db = _db()
+    # Revérification périodique : rattrape un changement de schéma fait par un autre processus
+    _ensure_users_tables(db)
+    _cleanup_expired(db)
+
+
+async def _periodic_cleanup() -> None:
+    # Purge des inscriptions et sessions expirées hors du chemin des requêtes (quelques écritures par minute au plus)
+    while True:
+        try:
+            await to_thread.run_sync(_purge_expired)
+        except Exception:  # noqa: BLE001
+            logger.exception("Purge périodique des inscriptions et sessions expirées impossible")
+        await asyncio.sleep(CLEANUP_INTERVAL_SECONDS)
+
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    # Les routes "def" tournent dans le pool anyio : on le borne explicitement.
+    to_thread.current_default_thread_limiter().total_tokens = _http_threads()
+    # Lecture des icônes des drivers et de la page d'accueil hors de la boucle, avant la première requête
+    await to_thread.run_sync(_drivers_payload)
+    await to_thread.run_sync(_index_html)
+    # Ouverture de la base et vérification des tables de l'interface avant la première requête
+    await to_thread.run_sync(_db)
+    cleanup = asyncio.create_task(_periodic_cleanup())
+    try:
+        yield
+    finally:
+        cleanup.cancel()
+        with _SMTP_LOCK:
+            _smtp_close()
+
+
+app = FastAPI(title="Optimasol GUI API", lifespan=_lifespan, default_response_class=JSONResponseClass)
 
 app.add_middleware(
     CORSMiddleware,
@@ -38,15 +114,64 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Historiques JSON volumineux : compression rapide (niveau 1) au-delà de 1 Ko.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=1)
+
+# Les payloads de l'interface (configuration client) tiennent largement sous cette taille.
+MAX_BODY_BYTES = 256 * 1024
+
+
+@app.middleware("http")
+async def _limit_body_size(request: Request, call_next):
+    length = request.headers.get("content-length")
+    if length is not None:
+        try:
+            too_large = int(length) > MAX_BODY_BYTES
+        except ValueError:
+            return JSONResponseClass({"detail": "Content-Length invalide"}, status_code=400)
+        if too_large:
+            return JSONResponseClass({"detail": "Requête trop volumineuse"}, status_code=413)
+    return await call_next(request)
 
 
 WEB_ROOT = PROJECT_ROOT / "web"
 STATIC_DIR = WEB_ROOT / "static"
 TEMPLATE_INDEX = WEB_ROOT / "templates" / "index.html"
+CLIENT_TEMPLATE_PATH = PROJECT_ROOT / "client_sample_shell.json"
+_CLIENT_TEMPLATE_CACHE: Dict[str, Any] = {}
+_DRIVERS_PAYLOAD: Dict[str, Any] = {}
 
 FORECAST_CACHE_TTL_SECONDS = 300
 _FORECAST_TODAY_CACHE: Dict[int, Dict[str, Any]] = {}
 
+# Corps JSON de /api/history déjà sérialisé, par client (client_id -> (monotonic, octets)) :
+# le tableau de bord interroge en boucle alors que les mesures n'arrivent qu'à chaque cycle du service.
+HISTORY_CACHE_TTL_SECONDS = 30
+_HISTORY_CACHE: Dict[int, tuple] = {}
+
+# Sessions validées récemment (token -> user_id, client_id, expiration) : évite de relire
+# ui_sessions / users_auth à chaque requête authentifiée.
+# Délai de révocation : une session supprimée hors de ce processus (CLI, cascade ON DELETE à la
+# suppression d'un client) reste acceptée au plus SESSION_CACHE_TTL_SECONDS, de même que le profil
+# servi par /api/me. Les révocations faites ici (logout, changement de mot de passe) sont immédiates.
+SESSION_CACHE_TTL_SECONDS = 30
+SESSION_CACHE_MAX_ENTRIES = 10_000
+_SESSION_CACHE: Dict[str, Dict[str, Any]] = {}
+# Cache partagé par tous les threads de travail : lectures, insertions, purges et révocations
+# passent par ce verrou. user_id -> numéro de sa dernière révocation (séquence croissante) :
+# une vérification lue en base avant une révocation n'est pas mise en cache après elle.
+_SESSION_LOCK = threading.Lock()
+_SESSION_REVOKED: Dict[int, int] = {}
+_SESSION_REVOCATION_SEQ = 0
+
+# Tentatives qui déclenchent un hachage Argon2id, par (portée, IP) : (nombre max, fenêtre en secondes).
+# Borne le CPU qu'un client anonyme peut consommer via /api/login ou l'inscription.
+LOGIN_RATE_LIMIT = (5, 60.0)
+SIGNUP_RATE_LIMIT = (3, 3600.0)
+# (portée, IP) -> (fenêtre en secondes, horodatages monotones des tentatives)
+_RATE_BUCKETS: Dict[tuple, tuple] = {}
+_RATE_LOCK = threading.Lock()
+
 
 # -------- Helpers ----------
 
@@ -54,6 +179,25 @@ def _now_iso():
     return datetime.now(timezone.utc).isoformat()
 
 
+def _json_bytes(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _json_text(payload: Any) -> str:
+    # Pour les colonnes TEXT de SQLite
+    if orjson is not None:
+        return orjson.dumps(payload).decode("utf-8")
+    return json.dumps(payload)
+
+
+def _json_loads(text: str | bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
 def _static_version() -> str:
     paths = [
         STATIC_DIR / "app.js",
@@ -72,23 +216,105 @@ def _static_version() -> str:
     return str(max(mtimes))
 
 
-def _hash_password(password: str, salt: str | None = None) -> str:
-    salt = salt or secrets.token_hex(16)
-    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), 100_000)
-    return f"{salt}${digest.hex()}"
+# Argon2id (mémoire-dure, 19 Mio / 2 passes / 1 fil) ; les hachages aux anciens
+# paramètres et les anciens PBKDF2 "sel$hex" sont remplacés à la connexion suivante.
+_PH = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+_LEGACY_PBKDF2_ROUNDS = 100_000
+
+
+def _hash_password(password: str) -> str:
+    return _PH.hash(password)
+
+
+# Hachage de référence (mot de passe aléatoire jamais divulgué), calculé au premier besoin
+_DUMMY_HASH: Dict[str, str] = {}
+
+
+def _dummy_verify(password: str) -> bool:
+    # Même coût Argon2id qu'une vraie vérification : un email inconnu ou un hachage
+    # illisible ne répond pas plus vite qu'un mauvais mot de passe.
+    if "hash" not in _DUMMY_HASH:
+        _DUMMY_HASH["hash"] = _PH.hash(secrets.token_urlsafe(32))
+    try:
+        _PH.verify(_DUMMY_HASH["hash"], password)
+    except (VerificationError, InvalidHashError):
+        pass
+    return False
 
 
-def _verify_password(password: str, stored: str) -> bool:
+def _verify_password(password: str, stored: Optional[str]) -> bool:
+    if not stored:
+        return _dummy_verify(password)
+    if stored.startswith("$argon2"):
+        try:
+            return _PH.verify(stored, password)
+        except VerificationError:
+            return False
+        except InvalidHashError:
+            return _dummy_verify(password)
     try:
         salt, hexd = stored.split("$", 1)
     except ValueError:
-        return False
-    test = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), 100_000)
-    return hmac.compare_digest(test.hex(), hexd)
+        return _dummy_verify(password)
+    try:
+        expected = bytes.fromhex(hexd)
+    except ValueError:
+        return _dummy_verify(password)
+    test = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), _LEGACY_PBKDF2_ROUNDS)
+    return hmac.compare_digest(test, expected)
+
+
+def _password_needs_rehash(stored: str) -> bool:
+    if not stored.startswith("$argon2"):
+        return True
+    try:
+        return _PH.check_needs_rehash(stored)
+    except InvalidHashError:
+        return True
+
+
+def _check_rate(req: Request, scope: str, limit: tuple) -> None:
+    # Fenêtre glissante en mémoire (horloge monotone). Derrière un proxy, lancer uvicorn avec
+    # --proxy-headers pour que req.client soit l'adresse réelle du visiteur.
+    max_hits, window = limit
+    key = (scope, req.client.host if req.client else "")
+    now = time.monotonic()
+    with _RATE_LOCK:
+        # Purge périodique des compteurs inactifs (même principe que le cache de sessions),
+        # chacun jugé sur sa propre fenêtre : un appel "login" ne vide pas un compteur "signup".
+        if len(_RATE_BUCKETS) % 256 == 0:
+            for other, (other_window, other_hits) in list(_RATE_BUCKETS.items()):
+                if not other_hits or now - other_hits[-1] > other_window:
+                    _RATE_BUCKETS.pop(other, None)
+        hits = _RATE_BUCKETS.setdefault(key, (window, deque()))[1]
+        while hits and now - hits[0] > window:
+            hits.popleft()
+        if len(hits) >= max_hits:
+            retry_after = int(window - (now - hits[0])) + 1
+            raise HTTPException(
+                429, "Trop de tentatives, réessayez plus tard", headers={"Retry-After": str(retry_after)}
+            )
+        hits.append(now)
+
+
+# Configuration lue une seule fois ; "kill -HUP <pid>" force une relecture au prochain appel.
+_CONFIG_CACHE: Dict[str, Any] = {}
 
 
 def _config() -> dict:
-    return load_config_file()
+    cfg = _CONFIG_CACHE.get("data")
+    if cfg is None:
+        cfg = load_config_file()
+        _CONFIG_CACHE["data"] = cfg
+    return cfg
+
+
+def _reload_config(*_args) -> None:
+    _CONFIG_CACHE.pop("data", None)
+
+
+if hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+    signal.signal(signal.SIGHUP, _reload_config)
 
 
 def _resolve_db_path(cfg: dict) -> Path:
@@ -102,168 +328,168 @@ def _resolve_db_path(cfg: dict) -> Path:
     return path
 
 
-def _db():
-    cfg = _config()
-    return DBManager(_resolve_db_path(cfg))
+# Un DBManager par fichier de base, ouvert une seule fois : ses connexions (une par thread)
+# et leurs PRAGMA sont réutilisées d'une requête à l'autre.
+_DB_MANAGERS: Dict[Path, DBManager] = {}
+_DB_MANAGERS_LOCK = threading.Lock()
+# path -> PRAGMA schema_version relevé après la dernière vérification/migration des tables
+# de l'interface. Un changement de schéma par un autre processus (CLI, service) relance la vérification.
+_SCHEMA_VERSIONS: Dict[Path, int] = {}
 
 
-def _ensure_activation_table(db: DBManager):
-    db.execute_commit(
-        """
-        CREATE TABLE IF NOT EXISTS activation_keys (
-            activation_key TEXT PRIMARY KEY,
-            client_id      INTEGER,
-            status         TEXT DEFAULT 'issued',
-            created_at     TEXT NOT NULL,
-            expires_at     TEXT,
-            used_at        TEXT
-        );
-        """,
-        (),
-    )
+def _db():
+    path = _resolve_db_path(_config())
+    db = _DB_MANAGERS.get(path)
+    if db is None:
+        with _DB_MANAGERS_LOCK:
+            db = _DB_MANAGERS.get(path)
+            if db is None:
+                db = DBManager(path)
+                # Tables de l'interface vérifiées une fois par base, pas à chaque requête
+                _ensure_users_tables(db)
+                _DB_MANAGERS[path] = db
+    return db
+
+
+def _schema_version(db: DBManager) -> Optional[int]:
+    rows = db.execute_query("PRAGMA schema_version")
+    return int(rows[0][0]) if rows else None
+
+
+# Tables de l'interface web. Les reconstructions (client_id devenu nullable, FK retirée)
+# copient puis remplacent la table dans une seule transaction : tout ou rien.
+_CREATE_ACTIVATION_KEYS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        activation_key TEXT PRIMARY KEY,
+        client_id      INTEGER,
+        status         TEXT DEFAULT 'issued',
+        created_at     TEXT NOT NULL,
+        expires_at     TEXT,
+        used_at        TEXT
+    );
+"""
+_CREATE_USERS_AUTH_SQL = """
+    CREATE TABLE IF NOT EXISTS users_auth (
+        id             INTEGER PRIMARY KEY AUTOINCREMENT,
+        email          TEXT UNIQUE NOT NULL,
+        name           TEXT NOT NULL,
+        password_hash  TEXT NOT NULL,
+        client_id      INTEGER NOT NULL,
+        preferences    TEXT,
+        created_at     TEXT NOT NULL,
+        FOREIGN KEY (client_id) REFERENCES users_main(id)
+            ON UPDATE CASCADE
+            ON DELETE CASCADE
+    );
+"""
+# Sans rowid : les lignes sont rangées dans le B-tree du token, la recherche de session
+# se fait en une seule descente (pas d'index de clé primaire puis de lecture de la table).
+_CREATE_UI_SESSIONS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        token      TEXT PRIMARY KEY,
+        user_id    INTEGER NOT NULL,
+        created_at TEXT NOT NULL,
+        expires_at TEXT NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users_auth(id)
+            ON UPDATE CASCADE
+            ON DELETE CASCADE
+    ) WITHOUT ROWID;
+"""
+_CREATE_SIGNUP_PENDING_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        token           TEXT PRIMARY KEY,
+        activation_key  TEXT NOT NULL,
+        client_id       INTEGER,
+        email           TEXT NOT NULL,
+        name            TEXT NOT NULL,
+        admin_identifier TEXT,
+        password_hash   TEXT NOT NULL,
+        created_at      TEXT NOT NULL,
+        expires_at      TEXT NOT NULL
+    );
+"""
+_ACTIVATION_KEYS_COLUMNS = "activation_key, client_id, status, created_at, expires_at, used_at"
+_SIGNUP_PENDING_COLUMNS = (
+    "token, activation_key, client_id, email, name, admin_identifier, password_hash, created_at, expires_at"
+)
+_UI_SESSIONS_COLUMNS = "token, user_id, created_at, expires_at"
 
-    fk_rows = db.execute_query("PRAGMA foreign_key_list('activation_keys')")
-    cols = db.execute_query("PRAGMA table_info('activation_keys')")
-    client_notnull = False
-    for col in cols:
+
+def _client_id_notnull(db: DBManager, table: str) -> bool:
+    for col in db.execute_query(f"PRAGMA table_info('{table}')"):
         if col[1] == "client_id":
-            client_notnull = bool(col[3])
-            break
+            return bool(col[3])
+    return False
 
-    if fk_rows or client_notnull:
-        db.execute_commit(
-            """
-            CREATE TABLE IF NOT EXISTS activation_keys_new (
-                activation_key TEXT PRIMARY KEY,
-                client_id      INTEGER,
-                status         TEXT DEFAULT 'issued',
-                created_at     TEXT NOT NULL,
-                expires_at     TEXT,
-                used_at        TEXT
-            );
-            """,
-            (),
-        )
-        db.execute_commit(
-            """
-            INSERT OR IGNORE INTO activation_keys_new
-            (activation_key, client_id, status, created_at, expires_at, used_at)
-            SELECT activation_key, client_id, status, created_at, expires_at, used_at
-            FROM activation_keys;
-            """,
-            (),
-        )
-        db.execute_commit("DROP TABLE activation_keys;", ())
-        db.execute_commit("ALTER TABLE activation_keys_new RENAME TO activation_keys;", ())
+
+def _has_rowid(db: DBManager, table: str) -> bool:
+    rows = db.execute_query("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return bool(rows) and "WITHOUT ROWID" not in " ".join((rows[0][0] or "").upper().split())
+
+
+def _rebuild_table(db: DBManager, table: str, create_sql: str, columns: str) -> None:
+    tmp = f"{table}_new"
+    db.execute_batch([
+        # Reste éventuel d'une reconstruction interrompue par une version antérieure
+        (f"DROP TABLE IF EXISTS {tmp};", ()),
+        (create_sql.format(name=tmp), ()),
+        (f"INSERT OR IGNORE INTO {tmp} ({columns}) SELECT {columns} FROM {table};", ()),
+        (f"DROP TABLE {table};", ()),
+        (f"ALTER TABLE {tmp} RENAME TO {table};", ()),
+    ])
+
+
+def _ensure_activation_table(db: DBManager):
+    db.execute_commit(_CREATE_ACTIVATION_KEYS_SQL.format(name="activation_keys"), ())
+    fk_rows = db.execute_query("PRAGMA foreign_key_list('activation_keys')")
+    if fk_rows or _client_id_notnull(db, "activation_keys"):
+        _rebuild_table(db, "activation_keys", _CREATE_ACTIVATION_KEYS_SQL, _ACTIVATION_KEYS_COLUMNS)
 
 
 def _ensure_users_tables(db: DBManager):
+    version = _schema_version(db)
+    if version is not None and _SCHEMA_VERSIONS.get(db.path_db) == version:
+        return
     _ensure_activation_table(db)
-    db.execute_commit(
-        """
-        CREATE TABLE IF NOT EXISTS users_auth (
-            id             INTEGER PRIMARY KEY AUTOINCREMENT,
-            email          TEXT UNIQUE NOT NULL,
-            name           TEXT NOT NULL,
-            password_hash  TEXT NOT NULL,
-            client_id      INTEGER NOT NULL,
-            preferences    TEXT,
-            created_at     TEXT NOT NULL,
-            FOREIGN KEY (client_id) REFERENCES users_main(id)
-                ON UPDATE CASCADE
-                ON DELETE CASCADE
-        );
-        """,
-        (),
-    )
-    db.execute_commit(
-        """
-        CREATE TABLE IF NOT EXISTS ui_sessions (
-            token      TEXT PRIMARY KEY,
-            user_id    INTEGER NOT NULL,
-            created_at TEXT NOT NULL,
-            expires_at TEXT NOT NULL,
-            FOREIGN KEY (user_id) REFERENCES users_auth(id)
-                ON UPDATE CASCADE
-                ON DELETE CASCADE
-        );
-        """,
-        (),
-    )
-    db.execute_commit(
-        """
-        CREATE TABLE IF NOT EXISTS signup_pending (
-            token           TEXT PRIMARY KEY,
-            activation_key  TEXT NOT NULL,
-            client_id       INTEGER,
-            email           TEXT NOT NULL,
-            name            TEXT NOT NULL,
-            admin_identifier TEXT,
-            password_hash   TEXT NOT NULL,
-            created_at      TEXT NOT NULL,
-            expires_at      TEXT NOT NULL
-        );
-        """,
-        (),
-    )
-
-    cols = db.execute_query("PRAGMA table_info('signup_pending')")
-    client_notnull = False
-    for col in cols:
-        if col[1] == "client_id":
-            client_notnull = bool(col[3])
-            break
-    if client_notnull:
-        db.execute_commit(
-            """
-            CREATE TABLE IF NOT EXISTS signup_pending_new (
-                token           TEXT PRIMARY KEY,
-                activation_key  TEXT NOT NULL,
-                client_id       INTEGER,
-                email           TEXT NOT NULL,
-                name            TEXT NOT NULL,
-                admin_identifier TEXT,
-                password_hash   TEXT NOT NULL,
-                created_at      TEXT NOT NULL,
-                expires_at      TEXT NOT NULL
-            );
-            """,
-            (),
-        )
-        db.execute_commit(
-            """
-            INSERT OR IGNORE INTO signup_pending_new
-            (token, activation_key, client_id, email, name, admin_identifier, password_hash, created_at, expires_at)
-            SELECT token, activation_key, client_id, email, name, admin_identifier, password_hash, created_at, expires_at
-            FROM signup_pending;
-            """,
-            (),
+    db.execute_batch([
+        (_CREATE_USERS_AUTH_SQL, ()),
+        (_CREATE_UI_SESSIONS_SQL.format(name="ui_sessions"), ()),
+        (_CREATE_SIGNUP_PENDING_SQL.format(name="signup_pending"), ()),
+        ("CREATE INDEX IF NOT EXISTS idx_users_auth_client_id ON users_auth (client_id);", ()),
+    ])
+    if _client_id_notnull(db, "signup_pending"):
+        _rebuild_table(db, "signup_pending", _CREATE_SIGNUP_PENDING_SQL, _SIGNUP_PENDING_COLUMNS)
+    if _has_rowid(db, "ui_sessions"):
+        _rebuild_table(db, "ui_sessions", _CREATE_UI_SESSIONS_SQL, _UI_SESSIONS_COLUMNS)
+    # Index de ui_sessions et signup_pending créés après une éventuelle reconstruction
+    # (DROP TABLE les supprime)
+    db.execute_batch([
+        ("CREATE INDEX IF NOT EXISTS idx_ui_sessions_user_id ON ui_sessions (user_id);", ()),
+        ("CREATE INDEX IF NOT EXISTS idx_ui_sessions_expires ON ui_sessions (expires_at);", ()),
+        ("CREATE UNIQUE INDEX IF NOT EXISTS idx_signup_pending_activation ON signup_pending (activation_key);", ()),
+        ("CREATE INDEX IF NOT EXISTS idx_signup_pending_expires ON signup_pending (expires_at);", ()),
+    ])
+    _ensure_serial_unique_index(db)
+    version = _schema_version(db)
+    if version is not None:
+        _SCHEMA_VERSIONS[db.path_db] = version
+
+
+# Premier identifiant libre à partir de 1, calculé par SQLite sur la clé primaire
+_NEXT_CLIENT_ID_SQL = """
+    SELECT CASE
+        WHEN NOT EXISTS (SELECT 1 FROM users_main WHERE id = 1) THEN 1
+        ELSE (
+            SELECT MIN(t.id + 1) FROM users_main t
+            WHERE t.id >= 1 AND NOT EXISTS (SELECT 1 FROM users_main u WHERE u.id = t.id + 1)
         )
-        db.execute_commit("DROP TABLE signup_pending;", ())
-        db.execute_commit("ALTER TABLE signup_pending_new RENAME TO signup_pending;", ())
-
-    db.execute_commit(
-        """
-        CREATE UNIQUE INDEX IF NOT EXISTS idx_signup_pending_activation
-        ON signup_pending (activation_key);
-        """,
-        (),
-    )
+    END
+"""
 
 
 def _next_client_id(db: DBManager) -> int:
-    rows = db.execute_query("SELECT id FROM users_main ORDER BY id")
-    next_id = 1
-    for (cid,) in rows:
-        try:
-            cid_int = int(cid)
-        except Exception:
-            continue
-        if cid_int == next_id:
-            next_id += 1
-        elif cid_int > next_id:
-            break
-    return next_id
+    rows = db.execute_query(_NEXT_CLIENT_ID_SQL)
+    return int(rows[0][0]) if rows and rows[0][0] else 1
 
 
 def _extract_serial(driver_obj) -> str | None:
@@ -277,119 +503,285 @@ def _extract_serial(driver_obj) -> str | None:
     return str(serial) if serial else None
 
 
+# Expression identique à celle de idx_users_main_serial (schema.sql) pour que l'index serve
+_SERIAL_OWNER_SQL = """
+    SELECT id FROM users_main
+    WHERE (CASE WHEN json_valid(config_driver) THEN json_extract(config_driver, '$.serial_number') END) = ?
+      AND (? IS NULL OR id <> ?)
+    LIMIT 1
+"""
+
+
+# Unicité garantie par SQLite : deux inscriptions concurrentes avec le même numéro passent toutes
+# deux la vérification préalable (lecture hors verrou d'écriture), la seconde écriture échoue ici.
+# Créé côté interface (pas dans schema.sql) : une base contenant déjà des doublons doit
+# rester utilisable par le service et la CLI.
+_SERIAL_UNIQUE_INDEX = "idx_users_main_serial_unique"
+_SERIAL_EXPR = "(CASE WHEN json_valid(config_driver) THEN json_extract(config_driver, '$.serial_number') END)"
+_SERIAL_DUPLICATE_SQL = f"""
+    SELECT {_SERIAL_EXPR} AS serial FROM users_main
+    WHERE serial IS NOT NULL
+    GROUP BY serial HAVING COUNT(*) > 1
+    LIMIT 1
+"""
+_CREATE_SERIAL_UNIQUE_INDEX_SQL = f"CREATE UNIQUE INDEX IF NOT EXISTS {_SERIAL_UNIQUE_INDEX} ON users_main ({_SERIAL_EXPR});"
+
+
+def _ensure_serial_unique_index(db: DBManager) -> None:
+    duplicate = db.execute_query(_SERIAL_DUPLICATE_SQL)
+    if duplicate:
+        logger.warning(
+            "Numéro de série %s partagé par plusieurs clients : index unique %s non créé",
+            duplicate[0][0],
+            _SERIAL_UNIQUE_INDEX,
+        )
+        return
+    db.execute_commit(_CREATE_SERIAL_UNIQUE_INDEX_SQL, ())
+
+
+def _store_clients(db: DBManager, all_clients) -> None:
+    # Doublon de numéro de série écrit entre la vérification et l'écriture : même 409 que la vérification
+    try:
+        db.client_manager.store_all_clients(all_clients)
+    except sqlite3.IntegrityError as exc:
+        if _SERIAL_UNIQUE_INDEX in str(exc):
+            raise HTTPException(409, "Numéro de série déjà utilisé") from exc
+        raise
+
+
 def _ensure_unique_serial(db: DBManager, serial: str | None, exclude_client_id: int | None = None) -> None:
     if not serial:
         return
-    rows = db.execute_query("SELECT id, config_driver FROM users_main")
-    for row in rows:
-        cid, cfg = row[0], row[1]
-        if exclude_client_id is not None and int(cid) == int(exclude_client_id):
-            continue
-        try:
-            data = json.loads(cfg) if cfg else {}
-        except Exception:
-            data = {}
-        if isinstance(data, dict) and data.get("serial_number") == serial:
-            raise HTTPException(409, f"Numéro de série déjà utilisé par le client {cid}")
+    exclude = int(exclude_client_id) if exclude_client_id is not None else None
+    rows = db.execute_query(_SERIAL_OWNER_SQL, (serial, exclude, exclude))
+    if rows:
+        raise HTTPException(409, f"Numéro de série déjà utilisé par le client {rows[0][0]}")
 
 
-def _cleanup_pending(db: DBManager):
-    now = datetime.now(timezone.utc).isoformat()
-    db.execute_commit("DELETE FROM signup_pending WHERE expires_at < ?", (now,))
+def _cleanup_expired(db: DBManager, now: Optional[datetime] = None):
+    # Inscriptions et sessions expirées purgées ensemble : une seule transaction (un seul commit).
+    # Parcours de plage sur les index expires_at (toujours écrit en UTC ISO).
+    now_iso = (now or datetime.now(timezone.utc)).isoformat()
+    db.execute_batch([
+        ("DELETE FROM signup_pending WHERE expires_at < ?", (now_iso,)),
+        ("DELETE FROM ui_sessions WHERE expires_at < ?", (now_iso,)),
+    ])
 
 
-def _new_session(db: DBManager, user_id: int) -> str:
-    token = secrets.token_urlsafe(32)
+_INSERT_SESSION_SQL = (
+    "INSERT OR REPLACE INTO ui_sessions (token, user_id, created_at, expires_at) VALUES (?, ?, ?, ?)"
+)
+# Variante pour l'inscription : l'utilisateur est créé dans la même transaction, on le retrouve par email
+_INSERT_SESSION_BY_EMAIL_SQL = """
+    INSERT OR REPLACE INTO ui_sessions (token, user_id, created_at, expires_at)
+    SELECT ?, id, ?, ? FROM users_auth WHERE email = ?
+"""
+
+
+def _session_times() -> tuple[str, str, str]:
     now = datetime.now(timezone.utc)
     exp = now + timedelta(hours=12)
-    db.execute_commit(
-        "INSERT OR REPLACE INTO ui_sessions (token, user_id, created_at, expires_at) VALUES (?, ?, ?, ?)",
-        (token, user_id, now.isoformat(), exp.isoformat()),
-    )
+    return secrets.token_urlsafe(32), now.isoformat(), exp.isoformat()
+
+
+def _new_session(db: DBManager, user_id: int, client_id: Optional[int]) -> str:
+    seen_seq = _revocation_seq()
+    token, created_at, expires_at = _session_times()
+    db.execute_commit(_INSERT_SESSION_SQL, (token, user_id, created_at, expires_at))
+    _cache_new_session(token, user_id, client_id, expires_at, seen_seq)
     return token
 
 
+def _cache_new_session(
+    token: str, user_id: int, client_id: Optional[int], expires_at: str, seen_seq: int
+) -> None:
+    # Session tout juste écrite : mise en cache directe, la première requête authentifiée
+    # n'a pas à relire la jointure. seen_seq est relevé avant l'écriture (voir _cache_session).
+    valid_until = min(time.time() + SESSION_CACHE_TTL_SECONDS, datetime.fromisoformat(expires_at).timestamp())
+    _cache_session(token, {"user_id": user_id, "client_id": client_id, "valid_until": valid_until}, seen_seq)
+
+
 def _get_token(req: Request) -> str:
     raw = (req.headers.get("Authorization") or "").strip()
     if not raw:
         return ""
-    if raw.lower().startswith("bearer "):
+    # Seul le préfixe est mis en minuscules (pas une copie de tout l'en-tête)
+    if raw[:7].lower() == "bearer ":
         return raw[7:].strip()
     return raw
 
-def _require_session(req: Request, db: DBManager):
+def _cached_session(token: str) -> Optional[Dict[str, Any]]:
+    with _SESSION_LOCK:
+        entry = _SESSION_CACHE.get(token)
+        if entry is None:
+            return None
+        if time.time() > entry["valid_until"]:
+            _SESSION_CACHE.pop(token, None)
+            return None
+        return entry
+
+
+def _revocation_seq() -> int:
+    with _SESSION_LOCK:
+        return _SESSION_REVOCATION_SEQ
+
+
+def _cache_session(token: str, entry: Dict[str, Any], seen_seq: Optional[int] = None) -> None:
+    # seen_seq : numéro de révocation relevé avant la lecture en base. Si l'utilisateur a été
+    # révoqué depuis, la lecture est peut-être antérieure à la suppression : on ne la garde pas.
+    with _SESSION_LOCK:
+        if seen_seq is not None and _SESSION_REVOKED.get(entry["user_id"], 0) > seen_seq:
+            return
+        # Purge périodique des entrées périmées, puis éviction des plus anciennes si le plafond est atteint.
+        if len(_SESSION_CACHE) % 256 == 0 or len(_SESSION_CACHE) >= SESSION_CACHE_MAX_ENTRIES:
+            now = time.time()
+            for key, cached in list(_SESSION_CACHE.items()):
+                if now > cached["valid_until"]:
+                    _SESSION_CACHE.pop(key, None)
+            # On redescend à 90 % du plafond pour ne pas repurger à chaque insertion.
+            while len(_SESSION_CACHE) >= SESSION_CACHE_MAX_ENTRIES * 9 // 10:
+                _SESSION_CACHE.pop(next(iter(_SESSION_CACHE)), None)
+        _SESSION_CACHE[token] = entry
+
+
+def _revoke_sessions(user_id: Optional[int], token: Optional[str] = None) -> None:
+    # À appeler après la suppression en base. Sans token : toutes les sessions en cache de
+    # l'utilisateur (parcours complet, borné par SESSION_CACHE_MAX_ENTRIES, réservé aux révocations).
+    global _SESSION_REVOCATION_SEQ
+    with _SESSION_LOCK:
+        if user_id is not None:
+            _SESSION_REVOCATION_SEQ += 1
+            _SESSION_REVOKED[user_id] = _SESSION_REVOCATION_SEQ
+        if token is not None:
+            _SESSION_CACHE.pop(token, None)
+        else:
+            for key, cached in list(_SESSION_CACHE.items()):
+                if cached["user_id"] == user_id:
+                    _SESSION_CACHE.pop(key, None)
+
+
+# Session et client de l'utilisateur en une seule requête (sessions supprimées en cascade avec l'utilisateur).
+# L'échéance ISO est convertie en secondes epoch par SQLite (julianday gère le décalage +00:00) :
+# pas de datetime.fromisoformat côté Python, et la colonne reste du texte ISO pour les purges par index.
+_SESSION_LOOKUP_SQL = """
+    SELECT s.user_id, u.client_id, (julianday(s.expires_at) - 2440587.5) * 86400.0
+    FROM ui_sessions s JOIN users_auth u ON u.id = s.user_id
+    WHERE s.token = ?
+"""
+
+
+def _session_entry(req: Request, db: DBManager) -> Dict[str, Any]:
     token = _get_token(req)
     if not token:
         raise HTTPException(401, "Missing token")
 
-    rows = db.execute_query(
-        "SELECT user_id, expires_at FROM ui_sessions WHERE token = ?", (token,)
-    )
+    entry = _cached_session(token)
+    if entry is not None:
+        return entry
+
+    seen_seq = _revocation_seq()
+    rows = db.execute_query(_SESSION_LOOKUP_SQL, (token,))
     if not rows:
         raise HTTPException(401, "Invalid session")
 
-    user_id, expires_at = rows[0]
-    if datetime.fromisoformat(expires_at) < datetime.now(timezone.utc):
+    user_id, client_id, expires_epoch = rows[0]
+    now = time.time()
+    # Échéance illisible (NULL) traitée comme expirée
+    if expires_epoch is None or expires_epoch < now:
         # 过期顺手清理掉
         db.execute_commit("DELETE FROM ui_sessions WHERE token = ?", (token,))
         raise HTTPException(401, "Session expired")
 
-    return user_id
+    # Fin de validité de l'entrée (TTL du cache ou expiration de la session) en secondes epoch :
+    # les requêtes suivantes ne font qu'une comparaison de flottants, sans datetime.
+    valid_until = min(now + SESSION_CACHE_TTL_SECONDS, expires_epoch)
+    entry = {"user_id": user_id, "client_id": client_id, "valid_until": valid_until}
+    _cache_session(token, entry, seen_seq)
+    return entry
 
 
+def _require_session(req: Request, db: DBManager):
+    return _session_entry(req, db)["user_id"]
+
+
+def _require_client_id(req: Request, db: DBManager) -> int:
+    return _session_entry(req, db)["client_id"]
+
+
+# Modes tarifaires et variantes d'écriture acceptées depuis l'assistant
+PRICE_MODE_BASE = "BASE"
+PRICE_MODE_HPHC = "HPHC"
+_HPHC_ALIASES = frozenset({"HPHC", "HP/HC", "HC/HP", "HP-HC", "HC-HP"})
+
+
+# Gabarit de repli (fichier client_sample_shell.json absent) : constante, jamais modifiée.
+_DEFAULT_CLIENT_TEMPLATE: Dict[str, Any] = {
+    "id": 0,
+    "engine": {
+        "client_id": 0,
+        "water_heater": {
+            "volume": 200,
+            "power": 2400,
+            "insulation_coeff": 0.8,
+            "temp_cold_water": 15,
+        },
+        "prices": {"mode": PRICE_MODE_BASE, "base_price": 0.18, "resell_price": 0.06},
+        "features": {"gradation": True, "mode": "cost"},
+        "constraints": {"min_temp": 45, "forbidden_slots": [], "background_noise": 250.0},
+        "planning": [],
+    },
+    "weather": {
+        "client_id": 0,
+        "position": {"latitude": 0.0, "longitude": 0.0, "altitude": 0},
+        "installation": {
+            "rendement_global": 0.18,
+            "liste_panneaux": [
+                {"azimuth": 180, "tilt": 30, "surface_panneau": 1.8, "puissance_nominale": 350}
+            ],
+        },
+    },
+    "driver": {"type": "", "config": {}},
+}
+_DEFAULT_CLIENT_TEMPLATE_JSON = _json_text(_DEFAULT_CLIENT_TEMPLATE)
+
 
 def _load_client_template() -> dict:
-    template_path = PROJECT_ROOT / "client_sample_shell.json"
-    if template_path.exists():
+    # Gabarit conservé sous forme de texte JSON (relu seulement si le mtime change) :
+    # chaque appel renvoie une copie neuve via _json_loads (orjson si présent), bien plus rapide qu'un deepcopy.
+    try:
+        mtime = CLIENT_TEMPLATE_PATH.stat().st_mtime
+    except OSError:
+        mtime = None
+    if mtime is not None:
+        if _CLIENT_TEMPLATE_CACHE.get("mtime") == mtime:
+            return _json_loads(_CLIENT_TEMPLATE_CACHE["text"])
         try:
-            return json.loads(template_path.read_text())
+            text = CLIENT_TEMPLATE_PATH.read_text()
+            data = _json_loads(text)
+            _CLIENT_TEMPLATE_CACHE.update({"mtime": mtime, "text": text})
+            return data
         except Exception:
             pass
-    return {
-        "id": 0,
-        "engine": {
-            "client_id": 0,
-            "water_heater": {
-                "volume": 200,
-                "power": 2400,
-                "insulation_coeff": 0.8,
-                "temp_cold_water": 15,
-            },
-            "prices": {"mode": "BASE", "base_price": 0.18, "resell_price": 0.06},
-            "features": {"gradation": True, "mode": "cost"},
-            "constraints": {"min_temp": 45, "forbidden_slots": [], "background_noise": 250.0},
-            "planning": [],
-        },
-        "weather": {
-            "client_id": 0,
-            "position": {"latitude": 0.0, "longitude": 0.0, "altitude": 0},
-            "installation": {
-                "rendement_global": 0.18,
-                "liste_panneaux": [
-                    {"azimuth": 180, "tilt": 30, "surface_panneau": 1.8, "puissance_nominale": 350}
-                ],
-            },
-        },
-        "driver": {"type": "", "config": {}},
-    }
+    return _json_loads(_DEFAULT_CLIENT_TEMPLATE_JSON)
 
 
 def _deep_merge(base: dict, updates: dict) -> dict:
-    for key, value in updates.items():
-        if isinstance(value, dict) and isinstance(base.get(key), dict):
-            base[key] = _deep_merge(base[key], value)
-        else:
-            base[key] = value
+    # Parcours itératif (pile de couples à fusionner) : pas de récursion par niveau.
+    stack = [(base, updates)]
+    while stack:
+        dst, src = stack.pop()
+        for key, value in src.items():
+            current = dst.get(key)
+            if isinstance(value, dict) and isinstance(current, dict):
+                stack.append((current, value))
+            else:
+                dst[key] = value
     return base
 
 
 def _price_mode(value: Any) -> str:
     mode = str(value or "").strip().upper()
-    if mode == "BASE":
-        return "BASE"
-    if mode in {"HPHC", "HP/HC", "HC/HP", "HP-HC", "HC-HP"}:
-        return "HPHC"
-    return "BASE"
+    return PRICE_MODE_HPHC if mode in _HPHC_ALIASES else PRICE_MODE_BASE
 
 
 def _to_float(value: Any, default: float) -> float:
@@ -413,7 +805,7 @@ def _normalize_prices(prices: Any, defaults: Optional[Dict[str, Any]] = None) ->
         "resell_price": _to_float(source.get("resell_price"), _to_float(base_defaults.get("resell_price"), 0.06)),
     }
 
-    if mode == "HPHC":
+    if mode == PRICE_MODE_HPHC:
         normalized["hp_price"] = _to_float(source.get("hp_price"), _to_float(base_defaults.get("hp_price"), 0.22))
         normalized["hc_price"] = _to_float(source.get("hc_price"), _to_float(base_defaults.get("hc_price"), 0.14))
     else:
@@ -422,7 +814,7 @@ def _normalize_prices(prices: Any, defaults: Optional[Dict[str, Any]] = None) ->
 
 
 def _build_client_from_assistant(client_id: int, assistant: dict) -> dict:
-    template = deepcopy(_load_client_template())
+    template = _load_client_template()
     template["id"] = client_id
     if isinstance(template.get("engine"), dict):
         template["engine"]["client_id"] = client_id
@@ -434,7 +826,7 @@ def _build_client_from_assistant(client_id: int, assistant: dict) -> dict:
     driver = assistant.get("driver") or {}
 
     if isinstance(engine, dict):
-        default_prices = deepcopy(template["engine"].get("prices", {}))
+        default_prices = dict(template["engine"].get("prices") or {})  # valeurs scalaires : copie superficielle
         template["engine"] = _deep_merge(template["engine"], engine)
         template["engine"]["prices"] = _normalize_prices(template["engine"].get("prices"), default_prices)
     if isinstance(weather, dict):
@@ -468,11 +860,92 @@ def _normalize_driver_defs(drivers: List[type]) -> List[dict]:
     return normalized
 
 
+# Page d'accueil rendue une seule fois (OPTIMASOL_DEV=1 pour relire les fichiers à chaque appel)
+_INDEX_HTML: Dict[str, Any] = {}
+
+
+def _index_html() -> Optional[tuple[bytes, str]]:
+    if "body" in _INDEX_HTML and not os.environ.get("OPTIMASOL_DEV"):
+        return _INDEX_HTML["body"], _INDEX_HTML["etag"]
+    if not TEMPLATE_INDEX.exists():
+        return None
+    html = TEMPLATE_INDEX.read_text(encoding="utf-8")
+    body = html.replace("__STATIC_VERSION__", _static_version()).encode("utf-8")
+    _INDEX_HTML.update(body=body, etag=f'"{hashlib.sha1(body).hexdigest()}"')
+    return _INDEX_HTML["body"], _INDEX_HTML["etag"]
+
+
+def _drivers_payload() -> tuple[bytes, str]:
+    # Les drivers sont figés au démarrage : JSON (icônes incluses) sérialisé une seule fois.
+    if not _DRIVERS_PAYLOAD:
+        body = _json_bytes({"drivers": _normalize_driver_defs(ALL_DRIVERS)})
+        _DRIVERS_PAYLOAD.update(body=body, etag=f'"{hashlib.sha1(body).hexdigest()}"')
+    return _DRIVERS_PAYLOAD["body"], _DRIVERS_PAYLOAD["etag"]
+
+
 def _smtp_cfg() -> dict:
     cfg = _config()
     return cfg.get("smtp_config", {}) if isinstance(cfg, dict) else {}
 
 
+# Connexion SMTP conservée entre deux envois (TLS + AUTH une seule fois), protégée par
+# _SMTP_LOCK ; vérifiée par NOOP avant réutilisation et rouverte si le serveur l'a coupée.
+_SMTP_LOCK = threading.Lock()
+_SMTP_STATE: Dict[str, Any] = {}
+
+
+def _smtp_close() -> None:
+    conn = _SMTP_STATE.pop("conn", None)
+    _SMTP_STATE.pop("key", None)
+    if conn is None:
+        return
+    try:
+        conn.quit()
+    except (smtplib.SMTPException, OSError):
+        conn.close()
+
+
+def _smtp_connection(host: str, port: int, username: str, password: str, use_tls: bool) -> smtplib.SMTP:
+    key = (host, port, username, password, use_tls)
+    conn = _SMTP_STATE.get("conn")
+    if conn is not None and _SMTP_STATE.get("key") == key:
+        try:
+            if conn.noop()[0] == 250:
+                return conn
+        except (smtplib.SMTPException, OSError):
+            pass
+    _smtp_close()
+    conn = smtplib.SMTP(host, port, timeout=20)
+    try:
+        if use_tls:
+            conn.starttls()
+        conn.login(username, password)
+    except Exception:
+        conn.close()
+        raise
+    _SMTP_STATE.update(conn=conn, key=key)
+    return conn
+
+
+# Guide PDF joint au mail de bienvenue : relu seulement si son mtime change
+_WELCOME_ATTACHMENT: Dict[str, Any] = {}
+
+
+def _welcome_attachment(path: Path) -> Optional[bytes]:
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return None
+    key = (str(path), mtime)
+    if _WELCOME_ATTACHMENT.get("key") != key:
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        _WELCOME_ATTACHMENT.update(key=key, data=data)
+    return _WELCOME_ATTACHMENT["data"]
+
+
 def _send_welcome_email(to_email: str, name: str, config: dict) -> None:
     if not config or not config.get("enabled"):
         return
@@ -500,8 +973,8 @@ def _send_welcome_email(to_email: str, name: str, config: dict) -> None:
         path = Path(guide_path)
         if not path.is_absolute():
             path = (PROJECT_ROOT / path).resolve()
-        if path.exists():
-            data = path.read_bytes()
+        data = _welcome_attachment(path)
+        if data is not None:
             msg.add_attachment(
                 data,
                 maintype="application",
@@ -509,24 +982,30 @@ def _send_welcome_email(to_email: str, name: str, config: dict) -> None:
                 filename=path.name,
             )
 
-    with smtplib.SMTP(host, port, timeout=20) as server:
-        if use_tls:
-            server.starttls()
-        server.login(username, password)
-        server.send_message(msg)
-
-
-def _last_df_value(df, column: str) -> Optional[dict]:
+    params = (host, port, username, password, use_tls)
+    with _SMTP_LOCK:
+        try:
+            _smtp_connection(*params).send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # Connexion fermée par le serveur entre le NOOP et l'envoi : une seule reprise
+            _smtp_close()
+            _smtp_connection(*params).send_message(msg)
+        except OSError:
+            _smtp_close()
+            raise
+
+
+def _send_welcome_email_quietly(to_email: str, name: str, config: dict) -> None:
+    # Tâche d'arrière-plan : un échec d'envoi ne concerne plus la requête déjà répondue
     try:
-        if df is None or df.empty:
-            return None
-        row = df.tail(1).iloc[0]
-        ts = row.name.isoformat() if hasattr(row, "name") else None
-        return {"value": row[column], "timestamp": ts}
-    except Exception:
-        return None
+        _send_welcome_email(to_email, name, config)
+    except Exception:  # noqa: BLE001
+        logger.warning("Envoi de l'email de bienvenue à %s impossible", to_email, exc_info=True)
 
 
+# Les mêmes horodatages SQL reviennent d'un appel à l'autre (MAX(timestamp), historiques) ;
+# datetime étant immuable, le résultat peut être partagé.
+@lru_cache(maxsize=4096)
 def _parse_dt(value: Optional[str]) -> Optional[datetime]:
     if not value:
         return None
@@ -578,79 +1057,133 @@ def _last_df_timestamp(df) -> Optional[datetime]:
 def _parse_log_ts(line: str) -> Optional[datetime]:
     try:
         # Format attendu: "YYYY-MM-DD HH:MM:SS | ..."
-        stamp = line[:19]
-        dt = datetime.strptime(stamp, "%Y-%m-%d %H:%M:%S")
-        return dt.replace(tzinfo=timezone.utc)
-    except Exception:
+        return datetime.fromisoformat(line[:19]).replace(tzinfo=timezone.utc)
+    except ValueError:
         return None
 
 
-def _tail_lines(path: Path, limit: int = 4000) -> List[str]:
+_TAIL_BLOCK_BYTES = 64 * 1024
+# path -> (mtime_ns, taille, limit, octets) : un fichier inchangé n'est pas relu
+_TAIL_CACHE: Dict[Path, tuple] = {}
+
+
+def _tail_bytes(path: Path, limit: int = 4000) -> bytes:
+    # Dernières `limit` lignes du fichier, brutes (non décodées).
     try:
-        if not path.exists():
-            return []
-        with path.open("r", encoding="utf-8", errors="ignore") as fh:
-            return list(deque(fh, maxlen=limit))
-    except Exception:
-        return []
+        st = path.stat()
+    except OSError:
+        return b""
+    cached = _TAIL_CACHE.get(path)
+    if cached and cached[:3] == (st.st_mtime_ns, st.st_size, limit):
+        return cached[3]
+    try:
+        with path.open("rb") as fh:
+            # Lecture à rebours par blocs jusqu'à avoir limit lignes complètes
+            pos = fh.seek(0, os.SEEK_END)
+            data = b""
+            while pos > 0 and data.count(b"\n") <= limit:
+                step = min(_TAIL_BLOCK_BYTES, pos)
+                pos -= step
+                fh.seek(pos)
+                data = fh.read(step) + data
+    except OSError:
+        return b""
+    # Coupe juste après le saut de ligne qui précède les `limit` dernières lignes
+    # (la première ligne d'un bloc lu à rebours est tronquée, elle part avec).
+    start = len(data) - 1 if data.endswith(b"\n") else len(data)
+    for _ in range(limit):
+        start = data.rfind(b"\n", 0, start)
+        if start < 0:
+            break
+    if start >= 0:
+        data = data[start + 1:]
+    _TAIL_CACHE[path] = (st.st_mtime_ns, st.st_size, limit, data)
+    return data
+
+
+# Événements broker reconnus dans les logs du driver, en une seule passe du moteur regex.
+# "Activé" = connexion broker réussie + écoute active (subscribe OK) ;
+# "Échec" = déconnexion ou échec de connexion broker.
+_LOG_STATE_RE = re.compile(
+    r"(?P<activated>subscription to.*successful|successful.*subscription to"
+    r"|successfully connected to mqtt broker)"
+    r"|(?P<failed>disconnected from mqtt broker|connection failed with return code|initial connection failed)",
+    re.IGNORECASE,
+)
+
+
+def _log_line_state(line: str) -> Optional[str]:
+    match = _LOG_STATE_RE.search(line)
+    return match.lastgroup if match else None
 
 
 def _driver_state_from_logs(serial: Optional[str]) -> Dict[str, Optional[str]]:
     if not serial:
         return {"state": None, "event_at": None}
 
+    # Du plus récent au plus ancien : fichier courant puis rotations .1 et .2
     log_paths = [
         LOG_FILE,
         Path(str(LOG_FILE) + ".1"),
         Path(str(LOG_FILE) + ".2"),
     ]
-    all_lines: List[str] = []
+    needle = serial.encode("utf-8")
     for path in log_paths:
-        all_lines.extend(_tail_lines(path, limit=2500))
-
-    for line in reversed(all_lines):
-        if serial not in line:
-            continue
-
-        line_l = line.lower()
-        ts = _parse_log_ts(line)
-        ts_iso = ts.isoformat() if ts else None
-
-        # "Activé" = connexion broker réussie + écoute active (subscribe OK).
-        if "subscription to" in line_l and "successful" in line_l:
-            return {"state": "activated", "event_at": ts_iso}
-        if "successfully connected to mqtt broker" in line_l:
-            return {"state": "activated", "event_at": ts_iso}
-
-        # "Échec" = déconnexion ou échec de connexion broker.
-        if "disconnected from mqtt broker" in line_l:
-            return {"state": "failed", "event_at": ts_iso}
-        if "connection failed with return code" in line_l:
-            return {"state": "failed", "event_at": ts_iso}
-        if "initial connection failed" in line_l:
-            return {"state": "failed", "event_at": ts_iso}
+        data = _tail_bytes(path, limit=2500)
+        end = len(data)
+        # Recherche du numéro de série directement dans les octets ; seules les lignes
+        # qui le contiennent sont décodées.
+        while True:
+            hit = data.rfind(needle, 0, end)
+            if hit < 0:
+                break
+            start = data.rfind(b"\n", 0, hit) + 1
+            stop = data.find(b"\n", hit)
+            line = data[start:stop if stop >= 0 else len(data)].decode("utf-8", errors="ignore")
+            state = _log_line_state(line)
+            if state:
+                ts = _parse_log_ts(line)
+                return {"state": state, "event_at": ts.isoformat() if ts else None}
+            end = start
 
     return {"state": None, "event_at": None}
 
 
-def _latest_power_measured(db: DBManager, client_id: int) -> Optional[dict]:
+# Dernière valeur de chaque série en un seul aller-retour SQLite (UNION ALL).
+_LATEST_VALUES_SQL = """
+    SELECT * FROM (SELECT 'temperature', temperature, timestamp FROM temperatures
+                   WHERE id = ? ORDER BY timestamp DESC LIMIT 1)
+    UNION ALL
+    SELECT * FROM (SELECT 'production_measured', production, timestamp FROM productions_measurements
+                   WHERE id = ? ORDER BY timestamp DESC LIMIT 1)
+    UNION ALL
+    SELECT * FROM (SELECT 'decision', decision, timestamp FROM Decisions
+                   WHERE id = ? ORDER BY timestamp DESC LIMIT 1)
+    UNION ALL
+    SELECT * FROM (SELECT 'power_water_heater', decision, timestamp FROM decisions_measurements
+                   WHERE id = ? ORDER BY timestamp DESC LIMIT 1)
+"""
+
+
+def _latest_values(db: DBManager, client_id: int) -> Dict[str, Optional[dict]]:
+    latest: Dict[str, Optional[dict]] = {
+        "temperature": None,
+        "production_measured": None,
+        "decision": None,
+        "power_water_heater": None,
+    }
     try:
-        rows = db.execute_query(
-            """
-            SELECT decision, timestamp
-            FROM decisions_measurements
-            WHERE id = ?
-            ORDER BY timestamp DESC
-            LIMIT 1
-            """,
-            (client_id,),
-        )
-        if not rows:
-            return None
-        value, ts = rows[0]
-        return {"value": value, "timestamp": str(ts) if ts is not None else None}
+        rows = db.execute_query(_LATEST_VALUES_SQL, (client_id,) * 4)
     except Exception:
-        return None
+        return latest
+    for key, value, ts in rows:
+        if key == "power_water_heater":
+            # Horodatage brut, comme stocké par le service
+            latest[key] = {"value": value, "timestamp": str(ts) if ts is not None else None}
+            continue
+        dt = _parse_dt(str(ts)) if ts is not None else None
+        latest[key] = {"value": value, "timestamp": dt.astimezone(timezone.utc).isoformat() if dt else None}
+    return latest
 
 
 def _build_today_forecast_points(client_id: int, db: DBManager) -> List[Dict[str, Any]]:
@@ -662,7 +1195,7 @@ def _build_today_forecast_points(client_id: int, db: DBManager) -> List[Dict[str
     if not cfg_rows:
         return []
 
-    cfg_weather = json.loads(cfg_rows[0][0]) if cfg_rows[0][0] else {}
+    cfg_weather = _json_loads(cfg_rows[0][0]) if cfg_rows[0][0] else {}
     weather_client = WeatherClient.from_dict(cfg_weather)
     weather_client.client_id = client_id
 
@@ -692,15 +1225,21 @@ def _build_today_forecast_points(client_id: int, db: DBManager) -> List[Dict[str
         first_col = production_df.columns[0]
         prod_series = pd.to_numeric(production_df[first_col], errors="coerce")
 
-    points: List[Dict[str, Any]] = []
-    for ts, prod in zip(dt_series.tolist(), prod_series.tolist()):
-        if pd.isna(ts) or pd.isna(prod):
-            continue
-        ts_py = ts.to_pydatetime() if hasattr(ts, "to_pydatetime") else ts
-        ts_utc = ts_py.astimezone(timezone.utc) if ts_py.tzinfo else ts_py.replace(tzinfo=timezone.utc)
-        if ts_utc < start_utc or ts_utc >= end_utc:
-            continue
-        points.append({"timestamp": ts_utc.isoformat(), "production": float(prod)})
+    # Filtre vectorisé sur la journée locale : on ne boucle que sur les points retenus.
+    dt_index = pd.DatetimeIndex(dt_series)
+    keep = (
+        prod_series.notna().to_numpy()
+        & (dt_index >= start_utc)
+        & (dt_index < end_utc)
+    )
+
+    # Formatage des horodatages en un seul appel (index déjà en UTC, forecasts horaires).
+    ts_strings = dt_index[keep].strftime("%Y-%m-%dT%H:%M:%S+00:00")
+    productions = prod_series.to_numpy(dtype=float)[keep]
+    points: List[Dict[str, Any]] = [
+        {"timestamp": ts, "production": prod}
+        for ts, prod in zip(ts_strings, productions.tolist())
+    ]
 
     points.sort(key=lambda x: x["timestamp"])
     return points
@@ -723,41 +1262,37 @@ def _build_today_forecast_from_db(client_id: int, db: DBManager) -> List[Dict[st
         (client_id, start_utc.isoformat(), end_utc.isoformat()),
     )
 
-    points: List[Dict[str, Any]] = []
-    for ts_raw, production_raw in rows:
-        ts = _parse_dt(str(ts_raw))
-        if ts is None:
-            continue
-        try:
-            production = float(production_raw)
-        except Exception:
-            continue
-        points.append({"timestamp": ts.astimezone(timezone.utc).isoformat(), "production": production})
-    return points
+    if not rows:
+        return []
+
+    # Conversion en bloc, comme pour les prévisions météo : pas de parsing ni d'astimezone par ligne.
+    ts_raw, production_raw = zip(*rows)
+    dt_index = pd.DatetimeIndex(pd.to_datetime(ts_raw, utc=True, errors="coerce", format="ISO8601"))
+    productions = pd.to_numeric(pd.Series(production_raw), errors="coerce").to_numpy(dtype=float)
+    keep = dt_index.notna() & pd.notna(productions)
+
+    ts_strings = dt_index[keep].strftime("%Y-%m-%dT%H:%M:%S+00:00")
+    return [
+        {"timestamp": ts, "production": prod}
+        for ts, prod in zip(ts_strings, productions[keep].tolist())
+    ]
 
 
 # -------- Pydantic Models ----------
 
 
+# Contraintes déclaratives : validées par pydantic-core sans code Python par champ
+Name = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+Password = Annotated[str, StringConstraints(min_length=8)]
+
+
 class SignupPayload(BaseModel):
     activation_key: str
     email: EmailStr
-    name: str
-    password: str
+    name: Name
+    password: Password
     client: Dict[str, Any]
 
-    @validator("name")
-    def name_not_empty(cls, v):
-        if not v.strip():
-            raise ValueError("name required")
-        return v.strip()
-
-    @validator("password")
-    def strong_password(cls, v):
-        if len(v) < 8:
-            raise ValueError("password must be at least 8 chars")
-        return v
-
 
 class LoginPayload(BaseModel):
     email: EmailStr
@@ -771,27 +1306,15 @@ class ClientUpdatePayload(BaseModel):
 class SignupStartPayload(BaseModel):
     activation_key: str
     email: EmailStr
-    name: str
-    password: str
+    name: Name
+    password: Password
     password_confirm: str
 
-    @validator("name")
-    def start_name_not_empty(cls, v):
-        if not v.strip():
-            raise ValueError("name required")
-        return v.strip()
-
-    @validator("password")
-    def start_strong_password(cls, v):
-        if len(v) < 8:
-            raise ValueError("password must be at least 8 chars")
-        return v
-
-    @validator("password_confirm")
-    def passwords_match(cls, v, values):
-        if "password" in values and v != values["password"]:
+    @model_validator(mode="after")
+    def passwords_match(self):
+        if self.password != self.password_confirm:
             raise ValueError("passwords do not match")
-        return v
+        return self
 
 
 class SignupCompletePayload(BaseModel):
@@ -803,53 +1326,76 @@ class SignupCompletePayload(BaseModel):
 
 class PasswordChangePayload(BaseModel):
     current_password: str
-    new_password: str
+    new_password: Password
     new_password_confirm: str
 
-    @validator("new_password")
-    def new_password_strength(cls, v):
-        if len(v) < 8:
-            raise ValueError("password must be at least 8 chars")
-        return v
-
-    @validator("new_password_confirm")
-    def new_passwords_match(cls, v, values):
-        if "new_password" in values and v != values["new_password"]:
+    @model_validator(mode="after")
+    def new_passwords_match(self):
+        if self.new_password != self.new_password_confirm:
             raise ValueError("passwords do not match")
-        return v
+        return self
 
 
 # -------- Routes ----------
 
 
 @app.get("/", response_class=HTMLResponse)
-def index():
-    if not TEMPLATE_INDEX.exists():
+async def index(req: Request):
+    page = _index_html()
+    if page is None:
         raise HTTPException(404, "Template introuvable")
-    html = TEMPLATE_INDEX.read_text(encoding="utf-8")
-    html = html.replace("__STATIC_VERSION__", _static_version())
-    response = HTMLResponse(html)
-    response.headers["Cache-Control"] = "no-store"
-    return response
+    body, etag = page
+    # Revalidation à chaque visite (les URLs des assets y sont versionnées), 304 si inchangée
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if req.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(body, headers=headers)
 
 
 @app.get("/api/drivers")
-def drivers():
-    from optimasol.drivers import ALL_DRIVERS
-    return {"drivers": _normalize_driver_defs(ALL_DRIVERS)}
+async def drivers(req: Request):
+    # Réponse purement en mémoire : inutile de passer par le pool de threads
+    body, etag = _drivers_payload()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if req.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+# Requêtes des routes d'inscription : texte SQL fixe, réutilisé par le cache de statements
+# de chaque connexion (pas de nouvelle analyse/planification par SQLite à chaque appel).
+_SIGNUP_KEY_SQL = "SELECT client_id, status, expires_at FROM activation_keys WHERE activation_key = ?"
+_KEY_STATUS_SQL = "SELECT status, expires_at FROM activation_keys WHERE activation_key = ?"
+_MARK_KEY_USED_SQL = (
+    "UPDATE activation_keys SET status='used', used_at=?, client_id=COALESCE(client_id, ?) WHERE activation_key=?"
+)
+_EMAIL_EXISTS_SQL = "SELECT 1 FROM users_auth WHERE email = ?"
+_USER_ID_BY_EMAIL_SQL = "SELECT id FROM users_auth WHERE email = ?"
+_CLIENT_HAS_USER_SQL = "SELECT 1 FROM users_auth WHERE client_id = ?"
+_INSERT_USER_SQL = (
+    "INSERT INTO users_auth (email, name, password_hash, client_id, preferences, created_at) VALUES (?, ?, ?, ?, ?, ?)"
+)
+_PENDING_EMAIL_BY_KEY_SQL = "SELECT email, expires_at FROM signup_pending WHERE activation_key = ?"
+_PENDING_BY_TOKEN_SQL = """
+    SELECT activation_key, client_id, email, name, admin_identifier, password_hash, expires_at
+    FROM signup_pending WHERE token = ?
+"""
+_INSERT_PENDING_SQL = """
+    INSERT INTO signup_pending
+    (token, activation_key, client_id, email, name, admin_identifier, password_hash, created_at, expires_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_DELETE_PENDING_BY_KEY_SQL = "DELETE FROM signup_pending WHERE activation_key = ?"
+_DELETE_PENDING_BY_TOKEN_SQL = "DELETE FROM signup_pending WHERE token = ?"
 
 
 @app.post("/api/signup/start")
-def signup_start(payload: SignupStartPayload):
+def signup_start(req: Request, payload: SignupStartPayload):
     db = _db()
-    _ensure_users_tables(db)
-    _cleanup_pending(db)
+    now = datetime.now(timezone.utc)
 
     # Ensure activation key exists and is available
-    row = db.execute_query(
-        "SELECT client_id, status, expires_at FROM activation_keys WHERE activation_key = ?",
-        (payload.activation_key,),
-    )
+    row = db.execute_query(_SIGNUP_KEY_SQL, (payload.activation_key,))
     if not row:
         raise HTTPException(400, "Clé invalide")
     client_id, status, expires_at = row[0]
@@ -857,36 +1403,35 @@ def signup_start(payload: SignupStartPayload):
         raise HTTPException(400, "Clé déjà utilisée ou expirée")
     if expires_at:
         try:
-            if datetime.fromisoformat(expires_at) < datetime.now(timezone.utc):
+            if datetime.fromisoformat(expires_at) < now:
                 raise HTTPException(400, "Clé expirée")
         except ValueError:
             pass
 
     # Email uniqueness
-    existing = db.execute_query("SELECT 1 FROM users_auth WHERE email = ?", (payload.email,))
+    existing = db.execute_query(_EMAIL_EXISTS_SQL, (payload.email,))
     if existing:
         raise HTTPException(400, "Email déjà utilisé")
 
     # Pending reservation
-    pending = db.execute_query(
-        "SELECT email FROM signup_pending WHERE activation_key = ?",
-        (payload.activation_key,),
-    )
-    if pending and pending[0][0] != payload.email:
-        raise HTTPException(409, "Inscription déjà en cours pour cette clé")
-    if pending and pending[0][0] == payload.email:
-        db.execute_commit("DELETE FROM signup_pending WHERE activation_key = ?", (payload.activation_key,))
+    # (une réservation expirée pas encore purgée ne bloque pas la clé)
+    pending = db.execute_query(_PENDING_EMAIL_BY_KEY_SQL, (payload.activation_key,))
+    if pending:
+        pending_email, pending_expires = pending[0]
+        try:
+            pending_expired = datetime.fromisoformat(pending_expires) < now
+        except ValueError:
+            pending_expired = False
+        if pending_email != payload.email and not pending_expired:
+            raise HTTPException(409, "Inscription déjà en cours pour cette clé")
+        db.execute_commit(_DELETE_PENDING_BY_KEY_SQL, (payload.activation_key,))
 
     token = secrets.token_urlsafe(32)
-    now = datetime.now(timezone.utc)
     exp = now + timedelta(hours=24)
+    _check_rate(req, "signup", SIGNUP_RATE_LIMIT)
     password_hash = _hash_password(payload.password)
     db.execute_commit(
-        """
-        INSERT INTO signup_pending
-        (token, activation_key, client_id, email, name, admin_identifier, password_hash, created_at, expires_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
+        _INSERT_PENDING_SQL,
         (
             token,
             payload.activation_key,
@@ -907,8 +1452,7 @@ def signup_pending(token: str):
     if not token:
         raise HTTPException(400, "Token manquant")
     db = _db()
-    _ensure_users_tables(db)
-    _cleanup_pending(db)
+    now = datetime.now(timezone.utc)
 
     rows = db.execute_query(
         "SELECT email, name, expires_at FROM signup_pending WHERE token = ?",
@@ -918,8 +1462,8 @@ def signup_pending(token: str):
         return {"valid": False}
     email, name, expires_at = rows[0]
     try:
-        if datetime.fromisoformat(expires_at) < datetime.now(timezone.utc):
-            db.execute_commit("DELETE FROM signup_pending WHERE token = ?", (token,))
+        if datetime.fromisoformat(expires_at) < now:
+            db.execute_commit(_DELETE_PENDING_BY_TOKEN_SQL, (token,))
             return {"valid": False}
     except ValueError:
         pass
@@ -927,42 +1471,33 @@ def signup_pending(token: str):
 
 
 @app.post("/api/signup/complete")
-def signup_complete(payload: SignupCompletePayload):
+def signup_complete(payload: SignupCompletePayload, background_tasks: BackgroundTasks):
     db = _db()
-    _ensure_users_tables(db)
-    _cleanup_pending(db)
+    now = datetime.now(timezone.utc)
+    now_iso = now.isoformat()
 
-    rows = db.execute_query(
-        """
-        SELECT activation_key, client_id, email, name, admin_identifier, password_hash, expires_at
-        FROM signup_pending WHERE token = ?
-        """,
-        (payload.signup_token,),
-    )
+    rows = db.execute_query(_PENDING_BY_TOKEN_SQL, (payload.signup_token,))
     if not rows:
         raise HTTPException(400, "Inscription introuvable ou expirée")
     activation_key, client_id, email, name, admin_identifier, password_hash, expires_at = rows[0]
     if client_id is None:
         client_id = _next_client_id(db)
-    if datetime.fromisoformat(expires_at) < datetime.now(timezone.utc):
-        db.execute_commit("DELETE FROM signup_pending WHERE token = ?", (payload.signup_token,))
+    if datetime.fromisoformat(expires_at) < now:
+        db.execute_commit(_DELETE_PENDING_BY_TOKEN_SQL, (payload.signup_token,))
         raise HTTPException(400, "Inscription expirée")
 
-    key_row = db.execute_query(
-        "SELECT status, expires_at FROM activation_keys WHERE activation_key = ?",
-        (activation_key,),
-    )
+    key_row = db.execute_query(_KEY_STATUS_SQL, (activation_key,))
     if not key_row:
         raise HTTPException(400, "Clé invalide")
     if key_row[0][0] != "issued":
-        existing = db.execute_query("SELECT 1 FROM users_auth WHERE client_id = ?", (client_id,))
+        existing = db.execute_query(_CLIENT_HAS_USER_SQL, (client_id,))
         if existing:
             raise HTTPException(409, "Compte déjà créé. Connectez-vous.")
         raise HTTPException(400, "Clé déjà utilisée ou expirée")
     key_expires = key_row[0][1]
     if key_expires:
         try:
-            if datetime.fromisoformat(key_expires) < datetime.now(timezone.utc):
+            if datetime.fromisoformat(key_expires) < now:
                 raise HTTPException(400, "Clé expirée")
         except ValueError:
             pass
@@ -988,8 +1523,7 @@ def signup_complete(payload: SignupCompletePayload):
         pass
 
     try:
-        from optimasol.cli import _build_client_from_json
-        new_client = _build_client_from_json(client_payload, start_driver=False)
+        new_client = _build_client(client_payload, start_driver=False)
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(400, f"Client invalide: {exc}") from exc
 
@@ -999,42 +1533,34 @@ def signup_complete(payload: SignupCompletePayload):
         all_clients.add(new_client)
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(400, f"Ajout client impossible: {exc}") from exc
-    db.client_manager.store_all_clients(all_clients)
+    _store_clients(db, all_clients)
 
-    preferences = json.dumps({"admin_identifier": admin_identifier} if admin_identifier else {})
+    # Utilisateur, session, clé et inscription en attente : une seule transaction (tout ou rien)
+    preferences = _json_text({"admin_identifier": admin_identifier} if admin_identifier else {})
+    seen_seq = _revocation_seq()
+    token, created_at, expires_at = _session_times()
     try:
-        db.execute_commit(
-            "INSERT INTO users_auth (email, name, password_hash, client_id, preferences, created_at) VALUES (?, ?, ?, ?, ?, ?)",
-            (email, name, password_hash, client_id, preferences, _now_iso()),
-        )
+        db.execute_batch([
+            (_INSERT_USER_SQL, (email, name, password_hash, client_id, preferences, now_iso)),
+            (_INSERT_SESSION_BY_EMAIL_SQL, (token, created_at, expires_at, email)),
+            (_MARK_KEY_USED_SQL, (now_iso, client_id, activation_key)),
+            (_DELETE_PENDING_BY_TOKEN_SQL, (payload.signup_token,)),
+        ])
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(400, f"Création utilisateur impossible: {exc}") from exc
+    user_id = db.execute_query(_USER_ID_BY_EMAIL_SQL, (email,))[0][0]
+    _cache_new_session(token, user_id, client_id, expires_at, seen_seq)
 
-    user_rows = db.execute_query("SELECT id FROM users_auth WHERE email = ?", (email,))
-    if not user_rows:
-        raise HTTPException(400, "Utilisateur introuvable après création")
-    user_id = user_rows[0][0]
-    token = _new_session(db, user_id)
-
-    db.execute_commit(
-        "UPDATE activation_keys SET status='used', used_at=?, client_id=COALESCE(client_id, ?) WHERE activation_key=?",
-        (_now_iso(), client_id, activation_key),
-    )
-
-    db.execute_commit("DELETE FROM signup_pending WHERE token = ?", (payload.signup_token,))
-
-    try:
-        _send_welcome_email(email, name, _smtp_cfg())
-    except Exception:
-        pass
+    # Envoi SMTP (TLS, pièce jointe) après la réponse : l'inscription n'attend pas le serveur mail
+    background_tasks.add_task(_send_welcome_email_quietly, email, name, _smtp_cfg())
 
     return {"token": token, "client_id": client_id}
 
 
 @app.post("/api/signup")
-def signup(payload: SignupPayload):
+def signup(req: Request, payload: SignupPayload):
     db = _db()
-    _ensure_users_tables(db)
+    now_iso = _now_iso()
 
     # 1) Activation key check
     row = db.execute_query(
@@ -1046,11 +1572,15 @@ def signup(payload: SignupPayload):
     if status != "issued":
         raise HTTPException(400, "Clé déjà utilisée ou expirée")
 
+    # Limite posée avant la création du client : une tentative refusée ne laisse rien en base
+    _check_rate(req, "signup", SIGNUP_RATE_LIMIT)
+
     # 2) Build client objects
     if client_id is None:
         client_id = _next_client_id(db)
 
-    client_payload = deepcopy(payload.client)
+    # Le corps de requête n'appartient qu'à cet appel : on le complète sur place (pas de deepcopy)
+    client_payload = payload.client
     client_payload["id"] = client_id
     if isinstance(client_payload.get("engine"), dict):
         client_payload["engine"]["client_id"] = client_id
@@ -1058,8 +1588,7 @@ def signup(payload: SignupPayload):
         client_payload["weather"]["client_id"] = client_id
 
     try:
-        from optimasol.cli import _build_client_from_json  # reuse logic
-        new_client = _build_client_from_json(client_payload, start_driver=False)
+        new_client = _build_client(client_payload, start_driver=False)
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(400, f"Client invalide: {exc}") from exc
 
@@ -1070,51 +1599,55 @@ def signup(payload: SignupPayload):
         all_clients.add(new_client)
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(400, f"Ajout client impossible: {exc}") from exc
-    db.client_manager.store_all_clients(all_clients)
-
-    # 4) Mark key used
-    db.execute_commit(
-        "UPDATE activation_keys SET status='used', used_at=?, client_id=COALESCE(client_id, ?) WHERE activation_key=?",
-        (_now_iso(), client_id, payload.activation_key),
-    )
+    _store_clients(db, all_clients)
 
-    # 5) Create auth user
+    # 4) Mark key used, create auth user and session in one transaction
     password_hash = _hash_password(payload.password)
-    db.execute_commit(
-        "INSERT INTO users_auth (email, name, password_hash, client_id, preferences, created_at) VALUES (?, ?, ?, ?, ?, ?)",
-        (payload.email, payload.name, password_hash, client_id, json.dumps({}), _now_iso()),
-    )
-    user_rows = db.execute_query("SELECT id FROM users_auth WHERE email = ?", (payload.email,))
-    if not user_rows:
-        raise HTTPException(400, "Utilisateur introuvable après création")
-    user_id = user_rows[0][0]
-    token = _new_session(db, user_id)
+    seen_seq = _revocation_seq()
+    token, created_at, expires_at = _session_times()
+    db.execute_batch([
+        (_MARK_KEY_USED_SQL, (now_iso, client_id, payload.activation_key)),
+        (_INSERT_USER_SQL, (payload.email, payload.name, password_hash, client_id, _json_text({}), now_iso)),
+        (_INSERT_SESSION_BY_EMAIL_SQL, (token, created_at, expires_at, payload.email)),
+    ])
+    user_id = db.execute_query(_USER_ID_BY_EMAIL_SQL, (payload.email,))[0][0]
+    _cache_new_session(token, user_id, client_id, expires_at, seen_seq)
     return {"token": token, "client_id": client_id}
 
 
 @app.post("/api/login")
-def login(payload: LoginPayload):
+def login(req: Request, payload: LoginPayload):
+    _check_rate(req, "login", LOGIN_RATE_LIMIT)
     db = _db()
-    _ensure_users_tables(db)
     row = db.execute_query(
-        "SELECT id, password_hash FROM users_auth WHERE email = ?", (payload.email,)
+        "SELECT id, password_hash, client_id FROM users_auth WHERE email = ?", (payload.email,)
     )
     if not row:
+        # Email inconnu : même travail qu'un mot de passe faux (pas d'énumération des comptes)
+        _dummy_verify(payload.password)
         raise HTTPException(401, "Identifiants invalides")
-    user_id, pwd_hash = row[0]
+    user_id, pwd_hash, client_id = row[0]
     if not _verify_password(payload.password, pwd_hash):
         raise HTTPException(401, "Identifiants invalides")
-    token = _new_session(db, user_id)
+    if _password_needs_rehash(pwd_hash):
+        db.execute_commit(
+            "UPDATE users_auth SET password_hash = ? WHERE id = ?",
+            (_hash_password(payload.password), user_id),
+        )
+    token = _new_session(db, user_id, client_id)
     return {"token": token}
 
 @app.post("/api/logout")
 def logout(req: Request):
     db = _db()
-    _ensure_users_tables(db)
 
     token = _get_token(req)
     if token:
+        # Suppression en base d'abord, éviction ensuite : une vérification concurrente lue
+        # avant la suppression ne peut plus remettre le token en cache (voir _cache_session).
+        rows = db.execute_query("SELECT user_id FROM ui_sessions WHERE token = ?", (token,))
         db.execute_commit("DELETE FROM ui_sessions WHERE token = ?", (token,))
+        _revoke_sessions(rows[0][0] if rows else None, token)
 
     return {"status": "ok"}
 
@@ -1122,25 +1655,29 @@ def logout(req: Request):
 @app.get("/api/me")
 def me(req: Request):
     db = _db()
-    user_id = _require_session(req, db)
-    row = db.execute_query(
-        "SELECT email, name, client_id, preferences FROM users_auth WHERE id = ?", (user_id,)
-    )[0]
-    return {
-        "email": row[0],
-        "name": row[1],
-        "client_id": row[2],
-        "preferences": json.loads(row[3]) if row[3] else {},
-    }
+    entry = _session_entry(req, db)
+    # Profil (préférences déjà décodées) gardé avec la session en cache, même durée de vie
+    profile = entry.get("profile")
+    if profile is None:
+        row = db.execute_query(
+            "SELECT email, name, client_id, preferences FROM users_auth WHERE id = ?", (entry["user_id"],)
+        )[0]
+        profile = {
+            "email": row[0],
+            "name": row[1],
+            "client_id": row[2],
+            "preferences": _json_loads(row[3]) if row[3] else {},
+        }
+        entry["profile"] = profile
+    return profile
 
 
 @app.get("/api/client")
 def get_client(req: Request):
     db = _db()
-    user_id = _require_session(req, db)
-    client_id = db.execute_query("SELECT client_id FROM users_auth WHERE id=?", (user_id,))[0][0]
-    all_clients = db.client_manager.get_all_clients(start_driver=False)
-    client = all_clients.which_client_by_id(client_id)
+    client_id = _require_client_id(req, db)
+    # Seule la ligne du client est relue (pas toute la flotte)
+    client = db.client_manager.get_client(client_id, start_driver=False)
     if client is None:
         raise HTTPException(404, "Client manquant")
     return {
@@ -1151,20 +1688,9 @@ def get_client(req: Request):
     }
 
 
-@app.post("/api/client")
-def update_client(req: Request, payload: ClientUpdatePayload):
-    db = _db()
-    user_id = _require_session(req, db)
-    client_id = db.execute_query("SELECT client_id FROM users_auth WHERE id=?", (user_id,))[0][0]
-
-    try:
-        from optimasol.cli import _build_client_from_json  # reuse logic
-        candidate = _build_client_from_json({**payload.client, "id": client_id}, start_driver=False)
-    except Exception as exc:  # noqa: BLE001
-        raise HTTPException(400, f"Client invalide: {exc}") from exc
-
-    all_clients = db.client_manager.get_all_clients(start_driver=False)
-    _ensure_unique_serial(db, _extract_serial(candidate.driver), exclude_client_id=client_id)
+def _replace_client(all_clients, candidate) -> None:
+    """Remplace (ou ajoute) le client de même id et ne recalcule que son couple (client, leader)."""
+    client_id = candidate.client_id
     found = False
     new_list = []
     for c in all_clients.list_of_clients:
@@ -1176,52 +1702,86 @@ def update_client(req: Request, payload: ClientUpdatePayload):
     if not found:
         new_list.append(candidate)
     all_clients.list_of_clients = new_list
-    all_clients.clients_with_leaders = [(c, all_clients._closest_leader(c) or c) for c in new_list]
-    all_clients.leaders = list({pair[1] for pair in all_clients.clients_with_leaders})
 
-    db.client_manager.store_all_clients(all_clients)
+    # Seul le couple (client modifié, leader) peut changer : les autres couples sont conservés.
+    # Un leader suivi par d'autres clients le reste, pour ne pas orpheliner ses suiveurs.
+    leads_others = any(
+        leader.client_id == client_id and c.client_id != client_id
+        for c, leader in all_clients.clients_with_leaders
+    )
+    pairs = [
+        (c, candidate if leader.client_id == client_id else leader)
+        for c, leader in all_clients.clients_with_leaders
+        if c.client_id != client_id
+    ]
+    if leads_others:
+        own_leader = candidate
+    else:
+        all_clients.leaders = [l for l in all_clients.leaders if l.client_id != client_id]
+        own_leader = all_clients._closest_leader(candidate) or candidate
+    pairs.append((candidate, own_leader))
+    pairs.sort(key=lambda pair: pair[0].client_id)
+    all_clients.clients_with_leaders = pairs
+    all_clients.leaders = list(dict.fromkeys(leader for _, leader in pairs))
+
+
+@app.post("/api/client")
+def update_client(req: Request, payload: ClientUpdatePayload):
+    db = _db()
+    client_id = _require_client_id(req, db)
+
+    try:
+        candidate = _build_client({**payload.client, "id": client_id}, start_driver=False)
+    except Exception as exc:  # noqa: BLE001
+        raise HTTPException(400, f"Client invalide: {exc}") from exc
+
+    all_clients = db.client_manager.get_all_clients(start_driver=False)
+    _ensure_unique_serial(db, _extract_serial(candidate.driver), exclude_client_id=client_id)
+    _replace_client(all_clients, candidate)
+    _store_clients(db, all_clients)
     return {"status": "ok"}
 
 
+# Configuration du driver et derniers horodatages des mesures : un seul aller-retour SQLite
+_HOME_STATUS_SQL = """
+    SELECT
+        (SELECT config_driver FROM users_main WHERE id = ?),
+        (SELECT MAX(timestamp) FROM temperatures WHERE id = ?),
+        (SELECT MAX(timestamp) FROM productions_measurements WHERE id = ?),
+        (SELECT MAX(timestamp) FROM decisions_measurements WHERE id = ?)
+"""
+
+
 @app.get("/api/home/status")
 def home_status(req: Request):
     db = _db()
-    user_id = _require_session(req, db)
-    client_id = db.execute_query("SELECT client_id FROM users_auth WHERE id=?", (user_id,))[0][0]
+    client_id = _require_client_id(req, db)
 
     now_utc = datetime.now(timezone.utc)
     pid = _read_service_pid()
     process_running = _is_process_alive(pid)
 
+    try:
+        cfg_driver_raw, temp_raw, prod_raw, power_raw = db.execute_query(
+            _HOME_STATUS_SQL, (client_id,) * 4
+        )[0]
+    except Exception:
+        cfg_driver_raw = temp_raw = prod_raw = power_raw = None
+
     serial = None
     try:
-        cfg_row = db.execute_query("SELECT config_driver FROM users_main WHERE id = ?", (client_id,))
-        if cfg_row:
-            cfg_driver = json.loads(cfg_row[0][0]) if cfg_row[0][0] else {}
-            if isinstance(cfg_driver, dict):
-                serial = cfg_driver.get("serial_number")
+        cfg_driver = _json_loads(cfg_driver_raw) if cfg_driver_raw else {}
+        if isinstance(cfg_driver, dict):
+            serial = cfg_driver.get("serial_number")
     except Exception:
         serial = None
 
     broker_event = _driver_state_from_logs(str(serial) if serial else None)
 
     # Dernier message routeur reçu (information affichée uniquement, pas utilisée pour le statut).
-    temp_ts = None
-    prod_ts = None
-    power_ts = None
-    try:
-        temp_row = db.execute_query("SELECT MAX(timestamp) FROM temperatures WHERE id = ?", (client_id,))
-        prod_row = db.execute_query("SELECT MAX(timestamp) FROM productions_measurements WHERE id = ?", (client_id,))
-        power_row = db.execute_query("SELECT MAX(timestamp) FROM decisions_measurements WHERE id = ?", (client_id,))
-
-        if temp_row and temp_row[0][0]:
-            temp_ts = _parse_dt(str(temp_row[0][0]))
-        if prod_row and prod_row[0][0]:
-            prod_ts = _parse_dt(str(prod_row[0][0]))
-        if power_row and power_row[0][0]:
-            power_ts = _parse_dt(str(power_row[0][0]))
-    except Exception:
-        pass
+    temp_ts = _parse_dt(str(temp_raw)) if temp_raw else None
+    prod_ts = _parse_dt(str(prod_raw)) if prod_raw else None
+    power_ts = _parse_dt(str(power_raw)) if power_raw else None
 
     timestamps = [ts for ts in [temp_ts, prod_ts, power_ts] if ts is not None]
     last_router_message = max(timestamps) if timestamps else None
@@ -1258,24 +1818,28 @@ def home_status(req: Request):
 @app.get("/api/home/forecast/today")
 def home_forecast_today(req: Request):
     db = _db()
-    user_id = _require_session(req, db)
-    client_id = db.execute_query("SELECT client_id FROM users_auth WHERE id=?", (user_id,))[0][0]
+    client_id = _require_client_id(req, db)
 
-    now_local = datetime.now().astimezone()
+    now_utc = datetime.now(timezone.utc)
+    now_local = now_utc.astimezone()
     tz_local = now_local.tzinfo or timezone.utc
     start_local = now_local.replace(hour=0, minute=0, second=0, microsecond=0)
     end_local = start_local + timedelta(days=1)
     start_utc = start_local.astimezone(timezone.utc)
     end_utc = end_local.astimezone(timezone.utc)
+    date_local = str(start_local.date())
+    now_mono = time.monotonic()
     cache_key = client_id
     cache_entry = _FORECAST_TODAY_CACHE.get(cache_key)
     points: List[Dict[str, Any]] = []
-    if cache_entry:
-        cached_at = cache_entry.get("cached_at")
-        cached_date = cache_entry.get("date_local")
-        age = (datetime.now(timezone.utc) - cached_at).total_seconds() if isinstance(cached_at, datetime) else None
-        if cached_date == str(start_local.date()) and age is not None and age <= FORECAST_CACHE_TTL_SECONDS:
-            points = cache_entry.get("points", [])
+    # Âge mesuré sur l'horloge monotone (insensible aux réglages de l'heure système) ;
+    # le changement de jour local invalide l'entrée.
+    if (
+        cache_entry
+        and cache_entry["date_local"] == date_local
+        and now_mono - cache_entry["cached_at"] <= FORECAST_CACHE_TTL_SECONDS
+    ):
+        points = cache_entry["points"]
 
     if not points:
         try:
@@ -1284,75 +1848,104 @@ def home_forecast_today(req: Request):
             # Fallback BDD pour rester robuste si la chaîne météo/PV échoue.
             points = _build_today_forecast_from_db(client_id, db)
         _FORECAST_TODAY_CACHE[cache_key] = {
-            "cached_at": datetime.now(timezone.utc),
-            "date_local": str(start_local.date()),
+            "cached_at": now_mono,
+            "date_local": date_local,
             "points": points,
         }
 
     last_forecast_point = _parse_dt(points[-1]["timestamp"]) if points else None
 
     return {
-        "date_local": str(start_local.date()),
+        "date_local": date_local,
         "timezone": str(tz_local),
         "start_utc": start_utc.isoformat(),
         "end_utc": end_utc.isoformat(),
         "points": points,
         "last_forecast_point_at": last_forecast_point.isoformat() if last_forecast_point else None,
-        "refreshed_at": datetime.now(timezone.utc).isoformat(),
+        "refreshed_at": now_utc.isoformat(),
     }
 
 
+# Séries de /api/history : (clé JSON, série du Getter, nom du champ de chaque point)
+_HISTORY_SERIES = (
+    ("temperatures", "temperatures", "temperature"),
+    ("production_measured", "productions_measurements", "production"),
+    ("decisions", "decisions", "decision"),
+    ("production_forecast", "productions", "production"),
+)
+
+
+def _history_body(db: DBManager, client_id: int) -> bytes:
+    # Corps JSON assemblé directement en octets, une série après l'autre (pas de dict intermédiaire
+    # des quatre séries ni de json.dumps global). Le corps complet est mis en cache par /api/history.
+    parts = []
+    for key, series, field in _HISTORY_SERIES:
+        rows = db.getter.get_rows(series, client_id, 200)
+        parts.append(_json_bytes(key) + b":" + _json_bytes([{field: v} for _, v in rows]))
+    return b"{" + b",".join(parts) + b"}"
+
+
 @app.get("/api/history")
 def history(req: Request):
     db = _db()
-    user_id = _require_session(req, db)
-    client_id = db.execute_query("SELECT client_id FROM users_auth WHERE id=?", (user_id,))[0][0]
-    temps = db.getter.get_temperatures(client_id, 200).to_dict(orient="records")
-    prod_meas = db.getter.get_production_measured(client_id, 200).to_dict(orient="records")
-    decisions = db.getter.get_decisions(client_id, 200).to_dict(orient="records")
-    prod_forecast = db.getter.get_production_forecast(client_id, 200).to_dict(orient="records")
-    return {
-        "temperatures": temps,
-        "production_measured": prod_meas,
-        "decisions": decisions,
-        "production_forecast": prod_forecast,
-    }
+    client_id = _require_client_id(req, db)
+    # Même forme qu'auparavant : une valeur par point, en ordre chronologique.
+    # Les mesures sont écrites par un autre processus (service) : pas d'invalidation possible
+    # ici, l'entrée expire simplement après HISTORY_CACHE_TTL_SECONDS (horloge monotone).
+    now_mono = time.monotonic()
+    cached = _HISTORY_CACHE.get(client_id)
+    if cached is not None and now_mono - cached[0] <= HISTORY_CACHE_TTL_SECONDS:
+        body = cached[1]
+    else:
+        body = _history_body(db, client_id)
+        _HISTORY_CACHE[client_id] = (now_mono, body)
+    return Response(content=body, media_type="application/json")
+
+
+def _temperature_items(rows: list, start_dt: Optional[datetime], end_dt: Optional[datetime]) -> List[Dict[str, Any]]:
+    if not rows:
+        return []
+    # Parsing, filtre exact et formatage en bloc (pas de datetime Python par ligne)
+    ts_raw, values = zip(*rows)
+    dt_index = pd.DatetimeIndex(pd.to_datetime(ts_raw, utc=True, errors="coerce", format="ISO8601"))
+    keep = dt_index.notna()
+    if start_dt is not None:
+        keep &= dt_index >= start_dt
+    if end_dt is not None:
+        keep &= dt_index <= end_dt
+    # Même texte que datetime.isoformat() : microsecondes omises lorsqu'elles sont nulles
+    ts_strings = dt_index[keep].strftime("%Y-%m-%dT%H:%M:%S.%f+00:00").str.replace(
+        ".000000+00:00", "+00:00", regex=False
+    )
+    kept_values = [v for v, k in zip(values, keep) if k]
+    return [{"timestamp": ts, "temperature": v} for ts, v in zip(ts_strings, kept_values)]
 
 
 @app.get("/api/history/temperature")
 def history_temperature(req: Request, start: str | None = None, end: str | None = None, limit: int | None = 500):
     db = _db()
-    user_id = _require_session(req, db)
-    client_id = db.execute_query("SELECT client_id FROM users_auth WHERE id=?", (user_id,))[0][0]
-    df = db.getter.get_temperatures(client_id, limit)
+    client_id = _require_client_id(req, db)
     start_dt = _parse_dt(start)
     end_dt = _parse_dt(end)
-    if start_dt:
-        df = df[df.index >= start_dt]
-    if end_dt:
-        df = df[df.index <= end_dt]
-    items = []
-    for ts, row in df.iterrows():
-        items.append({"timestamp": ts.isoformat(), "temperature": row["temperature"]})
-    return {"temperatures": items}
+    # Plage et limite appliquées par SQLite ; le filtre à la microseconde reste fait ci-dessous.
+    rows = db.getter.get_temperatures_between(client_id, start_dt, end_dt, limit)
+    items = _temperature_items(rows, start_dt, end_dt)
+    # Réponse construite directement : pas de passage par jsonable_encoder sur chaque point
+    return JSONResponseClass({"temperatures": items})
 
 
 @app.get("/api/summary")
 def summary(req: Request):
     db = _db()
-    user_id = _require_session(req, db)
-    client_id = db.execute_query("SELECT client_id FROM users_auth WHERE id=?", (user_id,))[0][0]
-    temp_df = db.getter.get_temperatures(client_id, 1)
-    prod_df = db.getter.get_production_measured(client_id, 1)
-    decision_df = db.getter.get_decisions(client_id, 1)
-    power_measured = _latest_power_measured(db, client_id)
-    return {
-        "temperature": _last_df_value(temp_df, "temperature"),
-        "production_measured": _last_df_value(prod_df, "production"),
-        "power_water_heater": power_measured,
+    client_id = _require_client_id(req, db)
+    latest = _latest_values(db, client_id)
+    return JSONResponseClass({
+        "temperature": latest["temperature"],
+        "production_measured": latest["production_measured"],
+        "power_water_heater": latest["power_water_heater"],
         "production_forecast": None,
-        "decision": _last_df_value(decision_df, "decision"),
-    }
+        "decision": latest["decision"],
+    })
 
 
 @app.post("/api/password/change")
@@ -1365,17 +1958,92 @@ def password_change(req: Request, payload: PasswordChangePayload):
     if not row:
         raise HTTPException(404, "Utilisateur introuvable")
     pwd_hash = row[0][0]
+    _check_rate(req, "login", LOGIN_RATE_LIMIT)
     if not _verify_password(payload.current_password, pwd_hash):
         raise HTTPException(401, "Mot de passe actuel invalide")
     new_hash = _hash_password(payload.new_password)
-    db.execute_commit(
-        "UPDATE users_auth SET password_hash = ? WHERE id = ?",
-        (new_hash, user_id),
-    )
+    # Nouveau mot de passe et fermeture des autres sessions du compte dans la même transaction ;
+    # la session courante est conservée.
+    db.execute_batch([
+        ("UPDATE users_auth SET password_hash = ? WHERE id = ?", (new_hash, user_id)),
+        ("DELETE FROM ui_sessions WHERE user_id = ? AND token <> ?", (user_id, _get_token(req))),
+    ])
+    _revoke_sessions(user_id)
     return {"status": "ok"}
 
 
 # -------- Static files ----------
 
+# Encodages précompressés servis s'ils existent à côté du fichier (app.js.br, app.js.gz), par préférence
+_PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+STATIC_IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+
+@lru_cache(maxsize=64)
+def _precompressed_for(accept_encoding: str) -> tuple:
+    """Variantes de _PRECOMPRESSED acceptées par l'en-tête Accept-Encoding, meilleure d'abord.
+
+    Chaque codage est comparé en entier (pas de sous-chaîne) avec son q (1 par défaut) ;
+    q=0 vaut refus, "*" couvre les codages non cités. À q égal, l'ordre de _PRECOMPRESSED prime.
+    """
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value.strip())
+                except ValueError:
+                    q = 0.0
+        qualities[coding] = q
+    ranked = []
+    for encoding, suffix in _PRECOMPRESSED:
+        q = qualities.get(encoding, qualities.get("*", 0.0))
+        if q > 0:
+            ranked.append((q, encoding, suffix))
+    # Tri stable : l'ordre de préférence du serveur départage les q égaux
+    ranked.sort(key=lambda item: -item[0])
+    return tuple((encoding, suffix) for _, encoding, suffix in ranked)
+
+
+class CachingStaticFiles(StaticFiles):
+    """StaticFiles avec cache HTTP long et variantes précompressées.
+
+    Les URLs versionnées par la page d'accueil (?v=<mtime>) changent à chaque modification :
+    elles sont mises en cache un an sans revalidation. Les autres sont revalidées (ETag).
+    """
+
+    async def get_response(self, path: str, scope) -> Response:
+        request_headers = Headers(scope=scope)
+        response = None
+        if scope["method"] in ("GET", "HEAD"):
+            for encoding, suffix in _precompressed_for(request_headers.get("accept-encoding", "")):
+                full_path, stat_result = await to_thread.run_sync(self.lookup_path, path + suffix)
+                if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                    continue
+                media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                response = FileResponse(
+                    full_path,
+                    stat_result=stat_result,
+                    media_type=media_type,
+                    headers={"Content-Encoding": encoding},
+                )
+                if self.is_not_modified(response.headers, request_headers):
+                    response = NotModifiedResponse(response.headers)
+                break
+        if response is None:
+            response = await super().get_response(path, scope)
+        # Le contenu dépend de Accept-Encoding (variantes ci-dessus ou GZipMiddleware)
+        response.headers["Vary"] = "Accept-Encoding"
+        versioned = "v" in parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        response.headers["Cache-Control"] = STATIC_IMMUTABLE_CACHE if versioned else "no-cache"
+        return response
+
+
 if STATIC_DIR.exists():
-    app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+    app.mount("/static", CachingStaticFiles(directory=STATIC_DIR, html=False), name="static")